@@ -0,0 +1,498 @@
+"""
+Benchmark the rendering of generated dashboards against a stubbed hass and
+dashboard, timing the stages separately:
+
+    config   DashboardConfig construction (schema validation, exclude rules)
+    compile  macro environment and compilation of all template strings
+    walk     rendering vars and views with compiled templates (and indexed slots)
+    json     serializing the rendered config
+    parse    parse__dashboard end to end with a cold template cache
+
+and the peak memory of a parse (plus serializing) with tracemalloc. Before
+timing, the output of the optimized paths (lazy vars, render state reuse, memo,
+executor, non native rendering and the walk stage) is compared with a render
+passing all vars to every template and the benchmark exits with an error when
+one differs. The
+dashboard is generated from a seed so runs with the same shape are
+comparable, use --output to save the results and --compare to show the
+difference with saved results.
+
+    python benchmarks/dashboard.py --views 4 --sections 4 --stacks 2 --depth 2 --cards 6 \\
+        --density 0.3 --excludes 20 --macros 0.2 --output before.json
+    python benchmarks/dashboard.py ... --compare before.json
+"""
+from argparse import ArgumentParser
+from copy import deepcopy
+from json import dump, load
+from pathlib import Path as FilePath
+from random import Random
+from statistics import median
+from time import perf_counter
+from typing import Any, Callable
+import asyncio
+import gc
+import platform
+import sys
+import tracemalloc
+
+sys.path.insert(0, str(FilePath(__file__).resolve().parents[1] / 'custom_components'))
+
+from homeassistant.components.lovelace.const import MODE_STORAGE  # noqa: E402
+from homeassistant.components.lovelace.dashboard import LovelaceConfig  # noqa: E402
+from homeassistant.helpers.json import json_bytes, json_fragment  # noqa: E402
+from homeassistant.helpers.template import is_template_string  # noqa: E402
+from lovelace_extend.dashboard import new_template_environment, parse__dashboard, parse_value, parse_view  # noqa: E402
+from lovelace_extend.dashboard_config import DashboardConfig  # noqa: E402
+from lovelace_extend.dashboard_state import RenderPass, RenderState  # noqa: E402
+from lovelace_extend.path import Path  # noqa: E402
+from lovelace_extend.template import TEMPLATE_CACHE, DashboardVars, DependencyResolver, TemplateRenderer  # noqa: E402
+import jinja2  # noqa: E402
+
+STAGES = ('config', 'compile', 'walk', 'json', 'parse')
+
+MACROS = {
+    'tile_card': {
+        'args': 'entity',
+        'content': "{{ {'type': 'tile', 'entity': entity, 'name': entity | replace('_', ' ') | title} }}",
+    },
+    'label': {
+        'args': 'name',
+        'content': "{{ name | title }}",
+    },
+}
+
+# templates by the kind of value they produce, {n} is replaced by a counter
+TEMPLATES = (
+    "{{ prefix }} {n}",
+    "{{ 'sensor.bench_%d' % {n} }}",
+    "{{ range({n} % 5 + 1) | list }}",
+    "{{ {'icon': 'mdi:numeric-%d' % ({n} % 10), 'color': colors[{n} % colors | length]} }}",
+    "{% for i in range(3) %}{{ prefix }}-{{ i }} {% endfor %}",
+    "{{ {n} is even }}",
+    "{{ prefix | slugify }}-{n}",
+)
+
+MACRO_TEMPLATES = (
+    "{{ label('card {n}') }}",
+)
+
+
+class StubHass:
+    """Enough of HomeAssistant for rendering templates which do not read states."""
+
+    def __init__(self) -> None:
+        self.data: dict[str, Any] = {}
+        self.config = None
+        self.states = None
+        self.loop: asyncio.AbstractEventLoop|None = None
+
+    async def async_add_executor_job(self, target: Callable[..., Any], *args: Any) -> Any:
+        return await asyncio.get_running_loop().run_in_executor(None, target, *args)
+
+
+class StubDashboard(LovelaceConfig):
+
+    def __init__(self, hass: Any, data: dict[str, Any]) -> None:
+        super().__init__(hass, 'bench', {'url_path': 'bench'})
+        self.data = data
+
+    @property
+    def mode(self) -> str:
+        return MODE_STORAGE
+
+    async def async_get_info(self) -> dict[str, Any]:
+        return {'mode': self.mode, 'views': len(self.data['views'])}
+
+    async def async_load(self, force: bool) -> dict[str, Any]:
+        return self.data
+
+    async def async_json(self, force: bool) -> Any:
+        return json_fragment(json_bytes(self.data))
+
+
+class Generator:
+    """Generates dashboards of views x sections x stacks (nested depth levels deep) x cards."""
+
+    def __init__(self, views: int, sections: int, stacks: int, depth: int, cards: int, density: float, excludes: int, macros: float, seed: int = 0) -> None:
+        self.views = views
+        self.sections = sections
+        self.stacks = stacks
+        self.depth = depth
+        self.cards = cards
+        self.density = density
+        self.excludes = excludes
+        self.macros = macros
+        self._seed = seed
+        self._random = Random(seed)
+        self._counter = 0
+
+    def generate(self) -> dict[str, Any]:
+        self._random.seed(self._seed)
+        self._counter = 0
+
+        config: dict[str, Any] = {
+            'vars': {
+                'prefix': 'bench',
+                'colors': "{{ ['red', 'green', 'blue'] }}",
+            },
+            'excludes': self._excludes(),
+        }
+
+        if self.macros > 0:
+            config['macros'] = deepcopy(MACROS)
+
+        return {
+            'lovelace_extend': config,
+            'views': [self._view(i) for i in range(self.views)],
+        }
+
+    def _excludes(self) -> list[str]:
+        rules = ['[markdown]content']
+
+        for i in range(1, self.excludes):
+            if i % 2:
+                rules.append(f"[entities]entities[{i}].name")
+            else:
+                rules.append(f"[tile]<^features\\[{i}\\]\\..+>")
+
+        return rules[:self.excludes]
+
+    def _view(self, i: int) -> dict[str, Any]:
+        return {
+            'type': 'sections',
+            'title': self._value(f"view {i}"),
+            'path': f"view-{i}",
+            'sections': [
+                {'type': 'grid', 'cards': [self._stack(self.depth) for _ in range(self.stacks)]}
+                for _ in range(self.sections)
+            ],
+        }
+
+    def _stack(self, depth: int) -> dict[str, Any]:
+        if depth <= 0:
+            return {'type': 'grid', 'columns': 2, 'cards': [self._card() for _ in range(self.cards)]}
+
+        return {
+            'type': 'vertical-stack' if depth % 2 else 'horizontal-stack',
+            'cards': [self._stack(depth - 1)],
+        }
+
+    def _card(self) -> dict[str, Any]|str:
+        n = self._next()
+
+        if self.macros > 0 and self._random.random() < self.macros:
+            return f"{{{{ tile_card('sensor.bench_{n}') }}}}"
+
+        match n % 3:
+            case 0:
+                return {
+                    'type': 'tile',
+                    'entity': self._value(f"sensor.bench_{n}"),
+                    'name': self._value(f"tile {n}"),
+                    'features': [{'type': 'target-temperature'}, {'type': 'fan-speed', 'style': self._value('icons')}],
+                    'tap_action': {'action': 'more-info'},
+                }
+            case 1:
+                return {
+                    'type': 'entities',
+                    'title': self._value(f"entities {n}"),
+                    'state_color': True,
+                    'entities': [{'entity': f"sensor.bench_{n}_{j}", 'name': self._value(f"row {j}")} for j in range(4)],
+                }
+            case _:
+                return {
+                    'type': 'markdown',
+                    'content': self._value(f"# markdown {n}"),
+                    'text_only': True,
+                }
+
+    def _value(self, static: str) -> str:
+        if self._random.random() >= self.density:
+            return static
+
+        pool = TEMPLATES + MACRO_TEMPLATES if self.macros > 0 else TEMPLATES
+
+        return self._random.choice(pool).replace('{n}', str(self._next()))
+
+    def _next(self) -> int:
+        self._counter += 1
+
+        return self._counter
+
+
+def templates(node: Any) -> list[str]:
+    """All template strings in the dashboard."""
+    found = []
+    stack = [node]
+
+    while stack:
+        node = stack.pop()
+
+        if isinstance(node, dict):
+            stack.extend(node.values())
+        elif isinstance(node, list):
+            stack.extend(node)
+        elif isinstance(node, str) and is_template_string(node):
+            found.append(node)
+
+    return found
+
+
+def count(node: Any) -> int:
+    if isinstance(node, dict):
+        return sum(1 + count(value) for value in node.values())
+
+    if isinstance(node, list):
+        return sum(1 + count(value) for value in node)
+
+    return 0
+
+
+class Benchmark:
+
+    def __init__(self, source: dict[str, Any], rounds: int) -> None:
+        self.source = source
+        self.rounds = rounds
+        self.hass = StubHass()
+        self.dashboard = StubDashboard(self.hass, source)
+        self.templates = templates(source)
+
+    def _measure(self, prepare: Callable[[], Any], run: Callable[[Any], Any]) -> list[float]:
+        times = []
+
+        for _ in range(self.rounds):
+            arg = prepare()
+            gc.collect()
+            gc.disable()
+            start = perf_counter()
+            run(arg)
+            times.append(perf_counter() - start)
+            gc.enable()
+
+        return times
+
+    def config(self) -> list[float]:
+        return self._measure(lambda: deepcopy(self.source['lovelace_extend']), DashboardConfig)
+
+    def compile(self) -> list[float]:
+        config = DashboardConfig(deepcopy(self.source['lovelace_extend']))
+
+        def run(_) -> None:
+            env = new_template_environment(self.hass, config)
+
+            for source in self.templates:
+                if config.native and TEMPLATE_CACHE.expression(env, source) is not None:
+                    continue
+
+                TEMPLATE_CACHE.get(env, source)
+
+            TEMPLATE_CACHE.invalidate(env)
+
+        return self._measure(lambda: None, run)
+
+    def walk(self) -> list[float]:
+        config = DashboardConfig(deepcopy(self.source['lovelace_extend']))
+        env = new_template_environment(self.hass, config)
+        vars = dict(config.vars)
+
+        def prepare() -> dict[str, Any]:
+            data = {name: value for name, value in self.source.items() if name != 'lovelace_extend'}
+            data['views'] = list(data['views'])
+            config.vars = DashboardVars(vars, DependencyResolver(env, vars, dict(config.get_macros()), config.templates))
+
+            return data
+
+        # the slot index is kept between renders (like the rendered cards, which are not)
+        slots = RenderState().slots
+
+        def run(data: dict[str, Any]) -> None:
+            state = RenderState()
+            state.slots = slots
+            render = RenderPass(state, env, config)
+            renderer = TemplateRenderer(env, config.vars, config.native)
+            config.vars.render = lambda name, value: parse_value(value, Path(None, ['vars', name]), renderer)
+
+            for i, view in enumerate(data['views']):
+                data['views'][i] = parse_view(view, config, renderer, render)
+
+            render.finish()
+
+        # compile outside the measured rounds
+        run(prepare())
+        times = self._measure(prepare, run)
+        TEMPLATE_CACHE.invalidate(env)
+
+        return times
+
+    def json(self) -> list[float]:
+        rendered = self.render()
+
+        return self._measure(lambda: rendered, json_bytes)
+
+    def parse(self) -> list[float]:
+        def prepare() -> None:
+            TEMPLATE_CACHE.clear()
+
+        return self._measure(prepare, lambda _: self.render())
+
+    def render(self, source: dict[str, Any]|None = None, state: RenderState|None = None) -> dict[str, Any]:
+        async def run() -> dict[str, Any]:
+            self.hass.loop = asyncio.get_running_loop()
+            return await parse__dashboard(self.hass, self.dashboard, state=state, source=source or self.source)
+
+        return asyncio.run(run())
+
+    def verify(self) -> list[str]:
+        """
+        Compare the output of the optimized paths (lazy vars, render state reuse,
+        memo, executor, the walk of the benchmark) with a walk which renders every
+        template with all vars, returns the paths which differ.
+        """
+        TEMPLATE_CACHE.clear()
+        expected = json_bytes(self._walk_once(eager=True))
+        state = RenderState()
+        failed = []
+
+        def options(**render: Any) -> dict[str, Any]:
+            extend = self.source['lovelace_extend']
+            return {**self.source, 'lovelace_extend': {**extend, 'render': {**extend.get('render', {}), **render}}}
+
+        variants: dict[str, Callable[[], Any]] = {
+            'full': lambda: self.render(state=RenderState()),
+            'cold': lambda: self.render(state=state),
+            'state': lambda: self.render(state=state),
+            'memo': lambda: self.render(options(memo=True)),
+            'executor': lambda: self.render(options(executor=True)),
+            'native': lambda: self.render(options(native=False)),
+            'walk': self._walk_once,
+        }
+
+        for name, variant in variants.items():
+            if json_bytes(variant()) != expected:
+                failed.append(name)
+
+        return failed
+
+    def _walk_once(self, eager: bool = False) -> dict[str, Any]:
+        config = DashboardConfig(deepcopy(self.source['lovelace_extend']))
+        env = new_template_environment(self.hass, config)
+        vars = dict(config.vars)
+        data = {name: value for name, value in self.source.items() if name != 'lovelace_extend'}
+        data['views'] = list(data['views'])
+        config.vars = DashboardVars(vars, DependencyResolver(env, vars, dict(config.get_macros()), config.templates))
+        renderer = TemplateRenderer(env, config.vars, config.native)
+        config.vars.render = lambda name, value: parse_value(value, Path(None, ['vars', name]), renderer)
+        render = RenderPass(RenderState(), env, config)
+
+        if eager:
+            # every template gets all vars, instead of the vars it was found to read
+            renderer = TemplateRenderer(env, dict(config.vars), config.native)
+
+        for i, view in enumerate(data['views']):
+            data['views'][i] = parse_view(view, config, renderer, render)
+
+        render.finish()
+        TEMPLATE_CACHE.invalidate(env)
+
+        return data
+
+    def peak_memory(self) -> int:
+        TEMPLATE_CACHE.clear()
+        gc.collect()
+        tracemalloc.start()
+
+        try:
+            json_bytes(self.render())
+
+            return tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+
+def report(results: dict[str, Any], previous: dict[str, Any]|None) -> None:
+    shape = results['shape']
+
+    print(' '.join(f"{name}={value}" for name, value in shape.items()))
+    print(f"python {results['python']}, jinja {results['jinja']}")
+    print(f"{results['nodes']} nodes, {results['templates']} templates, {results['rounds']} rounds")
+
+    if previous is not None and previous['shape'] != shape:
+        print("warning: compared results are from a differently shaped dashboard")
+
+    print()
+    print(f"{'stage':<10}{'min ms':>10}{'median ms':>12}{'us/node':>10}" + (f"{'change':>10}" if previous else ''))
+
+    for stage in STAGES:
+        best, middle = results['stages'][stage]['min'], results['stages'][stage]['median']
+        line = f"{stage:<10}{best * 1000:>10.2f}{middle * 1000:>12.2f}{best / results['nodes'] * 1e6:>10.3f}"
+
+        if previous is not None and stage in previous['stages']:
+            line += f"{(best / previous['stages'][stage]['min'] - 1) * 100:>+9.1f}%"
+
+        print(line)
+
+    line = f"{'peak':<10}{results['peak_memory'] / 2**20:>10.2f} MiB"
+
+    if previous is not None:
+        line += f"{(results['peak_memory'] / previous['peak_memory'] - 1) * 100:>+23.1f}%"
+
+    print(line)
+
+
+def main() -> None:
+    parser = ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--views', type=int, default=4)
+    parser.add_argument('--sections', type=int, default=4, help="sections per view")
+    parser.add_argument('--stacks', type=int, default=2, help="stacks per section")
+    parser.add_argument('--depth', type=int, default=2, help="nesting depth of the stacks")
+    parser.add_argument('--cards', type=int, default=6, help="cards in the innermost stack")
+    parser.add_argument('--density', type=float, default=0.3, help="fraction of the values which are templates")
+    parser.add_argument('--excludes', type=int, default=10, help="number of exclude rules")
+    parser.add_argument('--macros', type=float, default=0.2, help="fraction of cards rendered by a macro, 0 disables macros")
+    parser.add_argument('--rounds', type=int, default=10)
+    parser.add_argument('--output', help="write the results as json to this file")
+    parser.add_argument('--compare', help="compare with results written by --output")
+    args = parser.parse_args()
+
+    generator = Generator(args.views, args.sections, args.stacks, args.depth, args.cards, args.density, args.excludes, args.macros)
+    source = generator.generate()
+    benchmark = Benchmark(source, args.rounds)
+
+    if failed := benchmark.verify():
+        print(f"error: output differs from a render with all vars for: {', '.join(failed)}", file=sys.stderr)
+        sys.exit(1)
+
+    results = {
+        'shape': {
+            name: getattr(args, name)
+            for name in ('views', 'sections', 'stacks', 'depth', 'cards', 'density', 'excludes', 'macros')
+        },
+        'python': platform.python_version(),
+        'jinja': jinja2.__version__,
+        'rounds': args.rounds,
+        'nodes': count(source),
+        'templates': len(benchmark.templates),
+        'stages': {},
+    }
+
+    for stage in STAGES:
+        times = getattr(benchmark, stage)()
+        results['stages'][stage] = {'min': min(times), 'median': median(times)}
+
+    results['peak_memory'] = benchmark.peak_memory()
+
+    previous = None
+
+    if args.compare is not None:
+        with open(args.compare) as file:
+            previous = load(file)
+
+    report(results, previous)
+
+    if args.output is not None:
+        with open(args.output, 'w') as file:
+            dump(results, file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,174 @@
+"""
+Compare the per node overhead of the synchronous tree walker with a walk that
+creates a coroutine per node (like parse_card/parse_card_value used to), on a
+generated dashboard with ~50k properties. Then both render a chain of nested
+vertical stacks (5000 deep by default) to check the nesting is not limited by
+the recursion limit, which the coroutine walk is.
+
+    python benchmarks/walker.py [properties] [depth]
+"""
+from copy import deepcopy
+from pathlib import Path as FilePath
+from time import perf_counter
+from typing import Any
+import asyncio
+import gc
+import sys
+
+sys.path.insert(0, str(FilePath(__file__).resolve().parents[1] / 'custom_components'))
+
+from homeassistant.helpers.template import TemplateEnvironment, is_template_string  # noqa: E402
+from lovelace_extend.dashboard import parse_card  # noqa: E402
+from lovelace_extend.dashboard_card import CardPropertyVoter  # noqa: E402
+from lovelace_extend.dashboard_config import DashboardConfig  # noqa: E402
+from lovelace_extend.dashboard_state import RenderPass, RenderState  # noqa: E402
+from lovelace_extend.path import Path  # noqa: E402
+from lovelace_extend.template import TemplateRenderer  # noqa: E402
+
+
+def generate(properties: int) -> dict[str, Any]:
+    # a card has 10 properties, of which a nested entity list of 4
+    cards = [
+        {
+            'type': 'entities',
+            'title': f"card {i}",
+            'state_color': True,
+            'show_header_toggle': False,
+            'entities': [f"sensor.s{i}_{j}" for j in range(4)],
+            'tap_action': {'action': 'more-info'},
+        }
+        for i in range(properties // 10)
+    ]
+
+    return {'views': [{'type': 'masonry', 'title': f"view {i}", 'cards': cards[i::10]} for i in range(10)]}
+
+
+def generate_nested(depth: int) -> dict[str, Any]:
+    card = {'type': 'tile', 'entity': 'sensor.deep', 'name': "{{ 'depth ' ~ %d }}" % depth}
+
+    for _ in range(depth):
+        card = {'type': 'vertical-stack', 'title': "{{ 'stack' }}", 'cards': [card]}
+
+    return card
+
+
+def count(node: Any) -> int:
+    if isinstance(node, dict):
+        return sum(1 + count(value) for value in node.values())
+
+    if isinstance(node, list):
+        return sum(1 + count(value) for value in node)
+
+    return 0
+
+
+async def parse_card_async(root: Path, options: dict[str, Any], config: DashboardConfig, env: TemplateEnvironment):
+    """Reference walk with a coroutine per node, as parse_card was before the explicit stack walker."""
+    for name, value in options.items():
+        vote = root.next(name).get_excluded()
+
+        if CardPropertyVoter.MATCH_PATH_ALL == (CardPropertyVoter.MATCH_PATH_ALL & vote):
+            break
+
+        if CardPropertyVoter.MATCH_PATH == (CardPropertyVoter.MATCH_PATH & vote):
+            continue
+
+        options[name] = await parse_card_value_async(value, root.next(name), env, **config.vars)
+
+    for name, value in options.items():
+        if isinstance(value, dict) and 'type' in value:
+            await parse_card_async(root.new(value['type']), value, config, env)
+
+        if isinstance(value, list) and len(value) > 0 and 'type' in value[0]:
+            for i in range(len(value)):
+                await parse_card_async(root.new(options[name][i]['type']), options[name][i], config, env)
+
+
+async def parse_card_value_async(data: Any, root: Path, env: TemplateEnvironment, **kwargs: Any) -> Any:
+    if isinstance(data, dict):
+        if 'type' in data:
+            return data
+
+        for name, value in data.items():
+            path = root.next(name)
+            if not path.is_excluded():
+                data[name] = await parse_card_value_async(value, path, env, **kwargs)
+
+    if isinstance(data, list):
+        for i in range(len(data)):
+            if 'type' in data[i]:
+                continue
+            path = root.next(i)
+            if not path.is_excluded():
+                data[i] = await parse_card_value_async(data[i], path, env, **kwargs)
+
+    if isinstance(data, str) and is_template_string(data) and not root.is_excluded():
+        return TemplateRenderer(env, kwargs).render(data, root)
+
+    return data
+
+
+def check_nesting(depth: int, config: DashboardConfig, env: TemplateEnvironment) -> bool:
+    """Render nested stacks with the explicit stack walker (and a render pass indexing the cards)."""
+    source = generate_nested(depth)
+    render = RenderPass(RenderState(), env, config)
+    start = perf_counter()
+    render.index(source)
+    card = parse_card(Path(source['type'], [], config.voter), source, config, env, render)
+    render.finish()
+    elapsed = perf_counter() - start
+
+    for _ in range(depth):
+        card = card['cards'][0]
+
+    print(f"{'explicit stack':<20} {elapsed * 1000:8.1f} ms rendering {depth} nested stacks")
+
+    try:
+        asyncio.run(parse_card_async(Path(source['type'], [], config.voter), generate_nested(depth), config, env))
+    except RecursionError:
+        print(f"{'coroutine per node':<20} {'':>8}    recursion limit reached")
+
+    return card['name'] == f"depth {depth}"
+
+
+def main(properties: int = 50_000, rounds: int = 10, depth: int = 5_000) -> None:
+    source = generate(properties)
+    nodes = count(source)
+    config = DashboardConfig({})
+    env = TemplateEnvironment(None)
+
+    def run_sync(data: dict[str, Any]) -> None:
+        for view in data['views']:
+            parse_card(Path(view['type'], [], config.voter), view, config, env)
+
+    def run_async(data: dict[str, Any]) -> None:
+        async def views():
+            for view in data['views']:
+                await parse_card_async(Path(view['type'], [], config.voter), view, config, env)
+
+        asyncio.run(views())
+
+    for name, runner in (('coroutine per node', run_async), ('explicit stack', run_sync)):
+        best = float('inf')
+
+        for _ in range(rounds):
+            data = deepcopy(source)
+            gc.collect()
+            gc.disable()
+            start = perf_counter()
+            runner(data)
+            best = min(best, perf_counter() - start)
+            gc.enable()
+
+        print(f"{name:<20} {best * 1000:8.1f} ms {best / nodes * 1e6:6.2f} us/node ({nodes} nodes)")
+
+    if not check_nesting(depth, config, env):
+        print(f"error: the card nested {depth} deep is not rendered", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 50_000,
+        depth=int(sys.argv[2]) if len(sys.argv) > 2 else 5_000,
+    )
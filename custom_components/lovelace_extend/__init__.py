@@ -1,16 +1,20 @@
-from .const import LOGGER, DOMAIN
+from .bytecode import async_remove_bytecode_store
+from .const import LOGGER, DOMAIN, SYNC_WORKERS
 from .dashboard import LovelaceWrapper
+from .warmup import get_warmup
 from homeassistant.components.lovelace import _register_panel
 from homeassistant.components.lovelace.const import DOMAIN as LOVELACE_DOMAIN, MODE_YAML
 from homeassistant.components.lovelace.dashboard import LovelaceConfig
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant
+import asyncio
 
 
 async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
     """Handle removal of an entry."""
     LOGGER.debug("lovelace extend component removed, reverting all managed dashboards")
     await async_synchronize_dashboards(hass, None)
+    await async_remove_bytecode_store(hass)
 
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
@@ -27,48 +31,81 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     LOGGER.debug("disable all dashboard overlays because component is turned-off")
     await async_synchronize_dashboards(hass, None)
+    get_warmup(hass).async_cancel()
     return True
 
 
 async def async_update_options(hass: HomeAssistant, entry: ConfigEntry):
-    """Reload entry if options change."""
+    """Synchronize the dashboards when the options change."""
     LOGGER.info("config entry updated, recheck dashboards")
-    await hass.config_entries.async_reload(entry.entry_id)
     await async_synchronize_dashboards(hass, entry)
 
 
-async def async_synchronize_dashboards(hass: HomeAssistant, entry: ConfigEntry|None) -> None:
-    if 'dashboards' in hass.data[DOMAIN]:
-        for dashboard in hass.data[DOMAIN]['dashboards']:
-            if entry is None or 'dashboards' not in entry.data or dashboard not in entry.data['dashboards']:
-                item = hass.data[LOVELACE_DOMAIN]['dashboards'].get(dashboard, None)
-                if isinstance(item, LovelaceWrapper) and item is not None:
-                    LOGGER.info("reverting dashboard \"%s\" to original config", dashboard)
-                    hass.data[LOVELACE_DOMAIN]['dashboards'][dashboard] = await item.unwrap()
-                    if hass.data[LOVELACE_DOMAIN]['dashboards'][dashboard].mode != MODE_YAML:
-                        await register_panel(hass, hass.data[LOVELACE_DOMAIN]['dashboards'][dashboard])
-                elif item is None:
-                    LOGGER.info("dashboard %s seems to be removed from lovelace collection")
-                else:
-                    LOGGER.info("dashboard %s was not extended")
-
-    if entry is not None and 'dashboards' in entry.data:
-        for dashboard in entry.data['dashboards']:
-            if 'dashboards' not in hass.data[DOMAIN] or dashboard not in hass.data[DOMAIN]['dashboards']:
-                inner = hass.data[LOVELACE_DOMAIN]['dashboards'].get(dashboard, None)
-                if not isinstance(inner, LovelaceWrapper) and inner is not None:
-                    LOGGER.info("extending dashboard \"%s\"", dashboard)
-                    hass.data[LOVELACE_DOMAIN]['dashboards'][dashboard] = LovelaceWrapper(hass, inner)
-                    # update panel to yaml, so we disable the edit mode and can refresh/rebuild from gui
-                    if inner.mode != MODE_YAML:
-                        await register_panel(hass, hass.data[LOVELACE_DOMAIN]['dashboards'][dashboard], MODE_YAML)
-                elif inner is None:
-                    del entry.data['dashboards'][dashboard]
-                    LOGGER.info("dashboard %s seems to be removed from lovelace collection")
-                else:
-                    LOGGER.info("dashboard %s already managed", dashboard)
-
-    hass.data[DOMAIN] = entry.data if entry is not None else {}
+async def async_synchronize_dashboards(hass: HomeAssistant, entry: ConfigEntry|None, limit: int = SYNC_WORKERS) -> None:
+    """
+    Extend the selected dashboards and revert the others. Only the dashboards which
+    were (de)selected since the last synchronization are handled, at most limit
+    at the same time.
+    """
+    warmup = get_warmup(hass)
+    workers = asyncio.Semaphore(limit)
+    dashboards = hass.data[LOVELACE_DOMAIN]['dashboards']
+    managed = list(hass.data.get(DOMAIN, {}).get('dashboards', []))
+    selected = list(entry.data.get('dashboards', [])) if entry is not None else []
+
+    async def revert(dashboard: str) -> None:
+        item = dashboards.get(dashboard, None)
+
+        if item is None:
+            LOGGER.info("dashboard %s seems to be removed from lovelace collection", dashboard)
+        elif not isinstance(item, LovelaceWrapper):
+            LOGGER.info("dashboard %s was not extended", dashboard)
+        else:
+            LOGGER.info("reverting dashboard \"%s\" to original config", dashboard)
+            warmup.async_remove(item)
+
+            async with workers:
+                dashboards[dashboard] = inner = await item.unwrap()
+
+                if inner.mode != MODE_YAML:
+                    await register_panel(hass, inner)
+
+    async def extend(dashboard: str) -> bool:
+        inner = dashboards.get(dashboard, None)
+
+        if inner is None:
+            LOGGER.info("dashboard %s seems to be removed from lovelace collection", dashboard)
+            return False
+
+        if isinstance(inner, LovelaceWrapper):
+            LOGGER.info("dashboard %s already managed", dashboard)
+            return True
+
+        LOGGER.info("extending dashboard \"%s\"", dashboard)
+        dashboards[dashboard] = wrapper = LovelaceWrapper(hass, inner)
+        # render in the background so setup does not wait for it
+        warmup.async_schedule(wrapper)
+        wrapper.async_watch_source()
+
+        async with workers:
+            # update panel to yaml, so we disable the edit mode and can refresh/rebuild from gui
+            if inner.mode != MODE_YAML:
+                await register_panel(hass, wrapper, MODE_YAML)
+
+        return True
+
+    await asyncio.gather(*[revert(dashboard) for dashboard in managed if dashboard not in selected])
+
+    added = [dashboard for dashboard in selected if dashboard not in managed]
+    extended = dict(zip(added, await asyncio.gather(*[extend(dashboard) for dashboard in added])))
+
+    if entry is None:
+        hass.data[DOMAIN] = {}
+    else:
+        hass.data[DOMAIN] = {
+            **entry.data,
+            'dashboards': [dashboard for dashboard in selected if extended.get(dashboard, dashboard in managed)],
+        }
 
 
 async def register_panel(hass: HomeAssistant, conf: LovelaceConfig, mode: str|None = None) -> None:
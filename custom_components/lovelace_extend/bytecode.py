@@ -0,0 +1,168 @@
+from .const import BYTECODE_CACHE_MAX_AGE, BYTECODE_CACHE_SIZE, DATA_BYTECODE, DOMAIN, LOGGER
+from homeassistant.const import __version__ as HA_VERSION
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.storage import STORAGE_DIR
+from jinja2 import BytecodeCache, __version__ as JINJA_VERSION
+from jinja2.bccache import Bucket
+from threading import Lock
+from time import time
+import asyncio
+import os
+import shutil
+
+
+class BytecodeStore(BytecodeCache):
+    """
+    Bytecode of compiled templates stored in the storage directory of Home
+    Assistant, in a directory per Home Assistant and Jinja version. The entries
+    are read in memory when loaded and written by async_save, so templates can
+    be compiled on the event loop without blocking on file access.
+    """
+
+    _entries: dict[str, bytes]
+    _dirty: dict[str, bytes]
+    _used: set[str]
+    _loading: asyncio.Future|None = None
+
+    def __init__(self, path: str, max_size: int = BYTECODE_CACHE_SIZE, max_age: float = BYTECODE_CACHE_MAX_AGE) -> None:
+        self._path = path
+        self._directory = os.path.join(path, f"{HA_VERSION}-{JINJA_VERSION}")
+        self._max_size = max_size
+        self._max_age = max_age
+        self._entries = {}
+        self._dirty = {}
+        self._used = set()
+        # views can be rendered in worker threads
+        self._lock = Lock()
+
+    def load_bytecode(self, bucket: Bucket) -> None:
+        with self._lock:
+            data = self._entries.get(bucket.key)
+
+            if data is not None:
+                self._used.add(bucket.key)
+
+        if data is not None:
+            # resets the bucket when the source checksum or python version does not match
+            bucket.bytecode_from_string(data)
+
+    def dump_bytecode(self, bucket: Bucket) -> None:
+        data = bucket.bytecode_to_string()
+
+        with self._lock:
+            self._entries[bucket.key] = self._dirty[bucket.key] = data
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._dirty.clear()
+            self._used.clear()
+
+    async def async_load(self, hass: HomeAssistant) -> None:
+        if self._loading is None:
+            self._loading = hass.async_add_executor_job(self._load)
+
+        await self._loading
+
+    async def async_save(self, hass: HomeAssistant) -> None:
+        """Write the new entries and mark the used entries as recent."""
+        with self._lock:
+            dirty, self._dirty = self._dirty, {}
+            used, self._used = self._used, set()
+
+        if len(dirty) > 0 or len(used) > 0:
+            await hass.async_add_executor_job(self._save, dirty, used)
+
+    def _load(self) -> None:
+        os.makedirs(self._directory, exist_ok=True)
+
+        # entries of other Home Assistant or Jinja versions can not be used anymore
+        for name in os.listdir(self._path):
+            if os.path.join(self._path, name) != self._directory:
+                shutil.rmtree(os.path.join(self._path, name), ignore_errors=True)
+
+        expired = time() - self._max_age
+        entries = {}
+
+        for entry in os.scandir(self._directory):
+            if not entry.name.endswith('.cache'):
+                continue
+
+            try:
+                if entry.stat().st_mtime < expired:
+                    os.remove(entry.path)
+                    continue
+
+                with open(entry.path, 'rb') as file:
+                    entries[entry.name[:-6]] = file.read()
+            except OSError as err:
+                LOGGER.debug("failed to read bytecode cache entry %s: %s", entry.path, err)
+
+        with self._lock:
+            self._entries = {**entries, **self._entries}
+
+        LOGGER.debug("loaded %d templates from the bytecode cache", len(entries))
+
+    def _save(self, dirty: dict[str, bytes], used: set[str]) -> None:
+        now = time()
+
+        for key, data in dirty.items():
+            path = os.path.join(self._directory, f"{key}.cache")
+
+            try:
+                with open(f"{path}.tmp", 'wb') as file:
+                    file.write(data)
+
+                os.replace(f"{path}.tmp", path)
+            except OSError as err:
+                LOGGER.warning("failed to write bytecode cache entry %s: %s", path, err)
+
+        for key in used - dirty.keys():
+            try:
+                os.utime(os.path.join(self._directory, f"{key}.cache"), (now, now))
+            except OSError:
+                pass
+
+        self._prune()
+
+    def _prune(self) -> None:
+        """Remove the least recently used entries when the cache is larger than max_size."""
+        files = []
+
+        for entry in os.scandir(self._directory):
+            if entry.name.endswith('.cache'):
+                stat = entry.stat()
+                files.append((stat.st_mtime, stat.st_size, entry.path, entry.name[:-6]))
+
+        size = sum(file[1] for file in files)
+
+        for _, length, path, key in sorted(files):
+            if size <= self._max_size:
+                break
+
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+
+            size -= length
+
+            with self._lock:
+                self._entries.pop(key, None)
+
+
+async def async_get_bytecode_store(hass: HomeAssistant) -> BytecodeStore:
+    """The (loaded) bytecode cache shared by the dashboards which enable it."""
+    if DATA_BYTECODE not in hass.data:
+        hass.data[DATA_BYTECODE] = BytecodeStore(hass.config.path(STORAGE_DIR, DOMAIN, 'bytecode'))
+
+    await hass.data[DATA_BYTECODE].async_load(hass)
+
+    return hass.data[DATA_BYTECODE]
+
+
+async def async_remove_bytecode_store(hass: HomeAssistant) -> None:
+    if (store := hass.data.pop(DATA_BYTECODE, None)) is not None:
+        store.clear()
+
+    await hass.async_add_executor_job(shutil.rmtree, hass.config.path(STORAGE_DIR, DOMAIN, 'bytecode'), True)
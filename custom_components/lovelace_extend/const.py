@@ -1,6 +1,25 @@
+from datetime import timedelta
 from typing import Final
 import logging
 
 DOMAIN: Final = 'lovelace_extend'
 LOGGER: logging.Logger = logging.getLogger(__package__)
 CARD_PATH_PATTERN: str = r"^\[(?P<type>[^\]]+)\](?:<(?P<regex>.+)>|(?P<path>.+))?$"
+TEMPLATE_CACHE_SIZE: Final = 2048
+CONFIG_CACHE_SIZE: Final = 64
+INCREMENTAL_DEPTH: Final = 2
+RENDER_WORKERS: Final = 2
+REACTIVE_COOLDOWN: Final = 30.0
+RENDER_VERSION: Final = 1
+DATA_WARMUP: Final = f"{DOMAIN}.warmup"
+PROFILE_TOP: Final = 20
+DATA_BYTECODE: Final = f"{DOMAIN}.bytecode"
+BYTECODE_CACHE_SIZE: Final = 32 * 1024 * 1024
+BYTECODE_CACHE_MAX_AGE: Final = 30 * 24 * 3600
+RENDER_BUDGET: Final = 30.0
+TEMPLATE_BUDGET: Final = 2.0
+RENDER_SLICE: Final = 0.05
+STORE_DELAY: Final = 10.0
+SOURCE_DEBOUNCE: Final = 5.0
+SOURCE_POLL_INTERVAL: Final = timedelta(seconds=30)
+SYNC_WORKERS: Final = 4
@@ -1,30 +1,80 @@
-from .const import LOGGER
+from .bytecode import async_get_bytecode_store
+from .const import DATA_BYTECODE, DATA_WARMUP, DOMAIN, LOGGER, RENDER_VERSION, SOURCE_DEBOUNCE, SOURCE_POLL_INTERVAL, STORE_DELAY
 from .dashboard_card import CardPropertyVoter
-from .dashboard_config import DashboardConfig
+from .dashboard_config import CONFIG_CACHE, DashboardConfig
+from .dashboard_state import RenderPass, RenderState, fingerprint
 from .path import Path
-from ast import literal_eval
-from copy import deepcopy
-from homeassistant.components.lovelace.const import ConfigNotFound
+from .profile import RenderProfile, profile_macro
+from .template import (
+    ENVIRONMENTS,
+    TEMPLATE_CACHE,
+    DashboardEnvironment,
+    DashboardVars,
+    DependencyResolver,
+    RenderBudget,
+    RenderMemo,
+    RenderTopics,
+    TemplateRenderer,
+    ThreadSafeTemplateRenderer,
+    compile_template,
+)
+from homeassistant.components.lovelace.const import ConfigNotFound, EVENT_LOVELACE_UPDATED, MODE_YAML
 from homeassistant.components.lovelace.dashboard import (
     _config_info,
     LovelaceConfig,
     CONF_URL_PATH,
     CONFIG_STORAGE_VERSION
 )
-from homeassistant.core import HomeAssistant, callback
+from homeassistant.const import EVENT_STATE_CHANGED
+from homeassistant.core import CALLBACK_TYPE, Event, HomeAssistant, callback
 from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers.area_registry import EVENT_AREA_REGISTRY_UPDATED
+from homeassistant.helpers.debounce import Debouncer
+from homeassistant.helpers.device_registry import EVENT_DEVICE_REGISTRY_UPDATED
+from homeassistant.helpers.entity_registry import EVENT_ENTITY_REGISTRY_UPDATED
+from homeassistant.helpers.event import async_track_state_change_event, async_track_time_interval
+from homeassistant.helpers.floor_registry import EVENT_FLOOR_REGISTRY_UPDATED
 from homeassistant.helpers.json import json_bytes, json_fragment
+from homeassistant.helpers.label_registry import EVENT_LABEL_REGISTRY_UPDATED
 from jinja2.exceptions import TemplateError
 from homeassistant.helpers.storage import Store
 from homeassistant.helpers.template import is_template_string, TemplateEnvironment
-from typing import Any
+from homeassistant.loader import async_get_integration
+from hashlib import sha1
+from time import perf_counter
+from typing import Any, Callable, Final, Self
 import asyncio
+import os
 
 
 class LovelaceWrapper(LovelaceConfig):
 
     _store: Store
     _inner: LovelaceConfig
+    _templating: TemplateEnvironment|None = None
+    _templating_key: str|None = None
+    _state: RenderState
+    _changes: RenderTopics
+    _debouncer: Debouncer|None = None
+    _unsubscribe: list[CALLBACK_TYPE]
+    _fingerprint: str|None = None
+    _version: str|None = None
+    # digest of what is (or will be) stored, to skip writes of unchanged output
+    _digest: str|None = None
+    _json_digest: str|None = None
+    # the rendered views with the span of their JSON in _json_bytes, which is
+    # reused while a view is the same object (as reused from the render state)
+    _views_json: list[tuple[dict[str, Any], int, int]]
+    _json_bytes: bytes|None = None
+    # the running load and the forced load to run after it, see _async_load
+    _loading: asyncio.Task|None = None
+    _follow_up: asyncio.Task|None = None
+    # changes of the source of the inner dashboard, see async_watch_source
+    _source_debouncer: Debouncer|None = None
+    _unwatch: list[CALLBACK_TYPE]
+    _mtime: float|None = None
+    _render_lock: asyncio.Lock
+    _unwrapped: bool = False
 
     def __init__(self, hass: HomeAssistant, inner: LovelaceConfig) -> None:
 
@@ -35,11 +85,17 @@ class LovelaceWrapper(LovelaceConfig):
         )
 
         self._inner = inner
+        self._state = RenderState()
+        self._changes = RenderTopics()
+        self._unsubscribe = []
+        self._unwatch = []
+        # loads and reactive renders share the render state, so they run one at a time
+        self._render_lock = asyncio.Lock()
         self._data: dict[str, Any] | None = None
         self._json: json_fragment | None = None
+        self._views_json = []
 
-        config = deepcopy(inner.config)
-        config["mode"] = self.mode
+        config = {**inner.config, 'mode': self.mode}
 
         super().__init__(hass, inner.config[CONF_URL_PATH], config)
 
@@ -48,9 +104,37 @@ class LovelaceWrapper(LovelaceConfig):
         return self._inner
 
     async def unwrap(self, clear: bool = True) -> LovelaceConfig:
+        # stop everything which renders or saves first, so the store is not written after it is removed
+        self._unwrapped = True
+        self._async_untrack()
+        self._async_unwatch_source()
+
+        for debouncer in (self._debouncer, self._source_debouncer):
+            if debouncer is not None:
+                debouncer.async_shutdown()
+
+        self._debouncer = self._source_debouncer = None
+
+        tasks = [task for task in (self._follow_up, self._loading) if task is not None]
+
+        for task in tasks:
+            task.cancel()
 
-        if clear:
-            await self._remove()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+        # wait for a reactive render which is running
+        async with self._render_lock:
+            if clear:
+                await self._remove()
+
+            self._state.clear()
+            self._views_json = []
+            self._json_bytes = None
+
+        if self._templating_key is not None:
+            ENVIRONMENTS.release(self._templating_key)
+            self._templating = None
+            self._templating_key = None
 
         return self._inner
 
@@ -59,30 +143,338 @@ class LovelaceWrapper(LovelaceConfig):
         return self._inner.mode + "+"
 
     async def async_get_info(self):
-        return _config_info(self.mode, self._data or await self._load())
+        return _config_info(self.mode, await self._async_get_data())
 
     async def async_load(self, force: bool) -> dict[str, Any]:
         if force:
-            await self._store.async_remove()
-            self._data: dict[str, Any] | None = None
-            self._json: json_fragment | None = None
+            # the current config (and stored file) is kept until the new one is rendered
+            return await self._async_load(force)
+
+        return await self._async_get_data()
+
+    async def async_warmup(self) -> None:
+        """Prepare the config in the background, see DashboardWarmup."""
+        if self._data is None:
+            await self._async_load()
+
+    async def _async_get_data(self) -> dict[str, Any]:
+        if self._data is None and (warmup := self.hass.data.get(DATA_WARMUP)) is not None and warmup.pending(self):
+            await warmup.async_wait(self)
+
+        return self._data or await self._async_load()
+
+    async def _async_load(self, force: bool = False) -> dict[str, Any]:
+        """
+        Load the config once for concurrent callers, they wait for the running load.
+        A forced load while one is running is done after it, once for all of them.
+        """
+        if self._loading is None:
+            self._loading = self.hass.async_create_task(self._load(force), f"{DOMAIN} load {self.url_path}")
+            self._loading.add_done_callback(self._async_loaded)
+        elif force:
+            if self._follow_up is None:
+                self._follow_up = self.hass.async_create_task(self._async_load_after(self._loading), f"{DOMAIN} reload {self.url_path}")
+
+            return await asyncio.shield(self._follow_up)
+
+        return await asyncio.shield(self._loading)
+
+    async def _async_load_after(self, running: asyncio.Task) -> dict[str, Any]:
+        # the result (or error) of the running load is for its own callers
+        await asyncio.wait([running])
+        self._follow_up = None
 
-        return self._data or await self._load()
+        return await self._async_load(True)
+
+    @callback
+    def _async_loaded(self, task: asyncio.Task) -> None:
+        if self._loading is task:
+            self._loading = None
 
     async def _remove(self):
         await self._store.async_remove()
+        self._digest = None
+
+    async def _load(self, force: bool = False) -> dict[str, Any]:
+        """
+        Load the config, the stored config is used when it was rendered from the
+        same source by the same renderer version (and not forced) and rendered
+        again otherwise.
+        """
+        async with self._render_lock:
+            stored = await self._store.async_load()
+            source = await self._inner.async_load(force)
+            version = await self._render_version()
+            source_fingerprint = fingerprint([version, source])
+
+            if stored is not None and stored.get('version') == version and 'config' in stored:
+                self._digest = stored.get('digest')
+
+                if not force and stored.get('fingerprint') == source_fingerprint:
+                    self._state.load(stored.get('state', {}), stored['config'])
+                    self._data = stored['config']
+                    self._fingerprint = source_fingerprint
+                    self._json = None
+                    self._async_track()
+
+                    return self._data
+
+                # reuse the stored cards for the ones which did not change
+                if len(self._state.units) == 0 and len(self._state.volatile) == 0:
+                    self._state.load(stored.get('state', {}), stored['config'])
+
+                LOGGER.info("dashboard \"%s\" changed since it was rendered, rendering again", self.url_path)
+
+            try:
+                config = await parse__dashboard(self.hass, self._inner, self._template_environment, self._state, source=source)
+            except HomeAssistantError as err:
+                # keep the last good output (like one running over its time budget)
+                if self._data is None and stored is not None and 'config' in stored:
+                    self._data = stored['config']
+                    self._fingerprint = stored.get('fingerprint')
 
-    async def _load(self) -> dict[str, Any]:
-        """Load the config."""
-        config = await self._store.async_load()
+                if self._data is None:
+                    raise
 
-        if None is config:
-            config = await parse__dashboard(self.hass, self._inner)
-            await self._store.async_save(config)
+                LOGGER.error("failed to render dashboard \"%s\", using the last rendered config: %s", self.url_path, err)
+                self._async_track()
+
+                return self._data
+
+            self._async_rendered(config, source_fingerprint)
+            await self._save()
+            self._async_track()
+
+            return self._data
+
+    @callback
+    def _async_rendered(self, config: dict[str, Any], source_fingerprint: str) -> bool:
+        """Use the rendered config, with the fingerprint of the source it was rendered from."""
+        self._fingerprint = source_fingerprint
+
+        if config == self._data:
+            return False
 
         self._data = config
+        self._json = None
+
+        return True
+
+    async def _save(self) -> None:
+        """
+        Save the config when it (or its source) changed, delayed by STORE_DELAY so
+        following renders are written once. The store writes to a temporary file
+        and replaces the stored one, so a config is always on disk.
+        """
+        if self._unwrapped:
+            # the store is (being) removed
+            return
+
+        self._version = await self._render_version()
+
+        if self._json is None:
+            self._async_build_json()
+
+        digest = fingerprint([self._version, self._fingerprint, self._json_digest])
+
+        if digest == self._digest:
+            return
+
+        self._digest = digest
+        self._store.async_delay_save(self._data_to_save, STORE_DELAY)
+
+    @callback
+    def _data_to_save(self) -> dict[str, Any]:
+        return {
+            'version': self._version,
+            'fingerprint': self._fingerprint,
+            'digest': self._digest,
+            'config': self._data,
+            'state': self._state.dump(self._data),
+        }
+
+    async def _render_version(self) -> str:
+        """Version of the integration and renderer output, stored output of other versions is not used."""
+        return f"{(await async_get_integration(self.hass, DOMAIN)).version}/{RENDER_VERSION}"
+
+    @callback
+    def _async_track(self) -> None:
+        """Listen for changes of the entities and registries read by the templates of a reactive dashboard."""
+        self._async_untrack()
+
+        if not self._state.reactive or not (topics := self._state.topics):
+            return
+
+        if len(topics.entities) > 0:
+            self._unsubscribe.append(
+                async_track_state_change_event(self.hass, list(topics.entities), self._async_state_changed)
+            )
+
+        if topics.all_states or len(topics.domains) > 0:
+            self._unsubscribe.append(self.hass.bus.async_listen(EVENT_STATE_CHANGED, self._async_state_changed))
+
+        if topics.registry:
+            for event in (
+                EVENT_AREA_REGISTRY_UPDATED,
+                EVENT_DEVICE_REGISTRY_UPDATED,
+                EVENT_ENTITY_REGISTRY_UPDATED,
+                EVENT_FLOOR_REGISTRY_UPDATED,
+                EVENT_LABEL_REGISTRY_UPDATED,
+            ):
+                self._unsubscribe.append(self.hass.bus.async_listen(event, self._async_registry_updated))
+
+    @callback
+    def _async_untrack(self) -> None:
+        while self._unsubscribe:
+            self._unsubscribe.pop()()
+
+    @callback
+    def _async_state_changed(self, event: Event) -> None:
+        if self._state.topics.matches(entity_id := event.data['entity_id']):
+            self._changes.entities.add(entity_id)
+            self._async_schedule_render()
+
+    @callback
+    def _async_registry_updated(self, event: Event) -> None:
+        self._changes.registry = True
+        self._async_schedule_render()
+
+    @callback
+    def _async_schedule_render(self) -> None:
+        """Debounce and rate limit the renders for changes to at most one per cooldown."""
+        if self._debouncer is not None and self._debouncer.cooldown != self._state.cooldown:
+            self._debouncer.async_cancel()
+            self._debouncer = None
+
+        if self._debouncer is None:
+            self._debouncer = Debouncer(
+                self.hass,
+                LOGGER,
+                cooldown=self._state.cooldown,
+                immediate=False,
+                function=self._async_render_changes,
+            )
+
+        self._debouncer.async_schedule_call()
+
+    async def _async_render_changes(self) -> None:
+        """Render the cards again which read one of the changed entities or registries."""
+        changes, self._changes = self._changes, RenderTopics()
+
+        if self._data is None or not changes:
+            return
+
+        # not at the same time as a load, which uses the same render state
+        async with self._render_lock:
+            if self._unwrapped:
+                return
+
+            source = await self._inner.async_load(True)
+            source_fingerprint = fingerprint([await self._render_version(), source])
+
+            try:
+                config = await parse__dashboard(self.hass, self._inner, self._template_environment, self._state, changes, source)
+            except HomeAssistantError as err:
+                LOGGER.warning("failed to render dashboard \"%s\" after changes: %s", self.url_path, err)
+                return
+
+            self._async_track()
+            changed = self._async_rendered(config, source_fingerprint)
+            # also when the output is unchanged, the source could be
+            await self._save()
+
+        if changed:
+            LOGGER.debug("dashboard \"%s\" rendered again for changes", self.url_path)
+            self._async_fire_updated()
+
+    @callback
+    def _async_fire_updated(self) -> None:
+        # marked as ours, so it is not taken for a change of the inner dashboard
+        self.hass.bus.async_fire(EVENT_LOVELACE_UPDATED, {'url_path': self.url_path, DOMAIN: True})
+
+    @callback
+    def async_watch_source(self) -> None:
+        """
+        Render again in the background when the inner dashboard is updated (or for
+        a YAML dashboard, when its file is modified), clients get the current
+        config until it is done.
+        """
+        self._async_unwatch_source()
+        self._unwatch.append(self.hass.bus.async_listen(EVENT_LOVELACE_UPDATED, self._async_source_updated))
+
+        if self._inner.mode == MODE_YAML and getattr(self._inner, 'path', None) is not None:
+            self._unwatch.append(async_track_time_interval(self.hass, self._async_check_mtime, SOURCE_POLL_INTERVAL))
+
+    @callback
+    def _async_unwatch_source(self) -> None:
+        while self._unwatch:
+            self._unwatch.pop()()
+
+        self._mtime = None
+
+    @callback
+    def _async_source_updated(self, event: Event) -> None:
+        if event.data.get('url_path') == self.url_path and DOMAIN not in event.data:
+            self._async_schedule_reload()
+
+    async def _async_check_mtime(self, now: Any = None) -> None:
+        try:
+            mtime = await self.hass.async_add_executor_job(os.path.getmtime, self._inner.path)
+        except OSError:
+            return
+
+        if self._mtime is not None and mtime != self._mtime:
+            self._async_schedule_reload()
+
+        self._mtime = mtime
+
+    @callback
+    def _async_schedule_reload(self) -> None:
+        """Debounce the renders for a burst of edits of the source."""
+        if self._source_debouncer is None:
+            self._source_debouncer = Debouncer(
+                self.hass,
+                LOGGER,
+                cooldown=SOURCE_DEBOUNCE,
+                immediate=False,
+                function=self._async_reload_source,
+            )
+
+        self._source_debouncer.async_schedule_call()
+
+    async def _async_reload_source(self) -> None:
+        """Render the changed source, reusing the cards which did not change."""
+        if (previous := self._data) is None:
+            # not loaded yet, so the next load reads the changed source
+            return
+
+        try:
+            config = await self._async_load(True)
+        except HomeAssistantError as err:
+            LOGGER.warning("failed to render dashboard \"%s\" after its source changed: %s", self.url_path, err)
+            return
 
-        return self._data
+        if config is not previous:
+            LOGGER.info("dashboard \"%s\" rendered again for changes of its source", self.url_path)
+            self._async_fire_updated()
+
+    def _template_environment(self, config: DashboardConfig) -> TemplateEnvironment:
+        """
+        Reuse the environment (and so its compiled templates) as long as macros and
+        templates are unchanged, dashboards with the same library share it.
+        """
+        key = config.environment_key
+
+        if self._templating is None or self._templating_key != key:
+            environment = ENVIRONMENTS.acquire(key, lambda: new_template_environment(self.hass, config))
+
+            if self._templating_key is not None:
+                ENVIRONMENTS.release(self._templating_key)
+
+            self._templating = environment
+            self._templating_key = key
+
+        return self._templating
 
     async def async_json(self, force: bool) -> json_fragment:
         """Return JSON representation of the config."""
@@ -90,51 +482,160 @@ class LovelaceWrapper(LovelaceConfig):
             await self.async_load(True)
 
         if self._data is None:
-            await self._load()
+            await self._async_get_data()
 
         return self._json or self._async_build_json()
 
     @callback
     def _async_build_json(self) -> json_fragment:
-        """Build JSON representation of the config."""
+        """
+        Build JSON representation of the config. Only the views which are not the
+        same object as in the last build are serialized again, the JSON of the
+        others is copied from the last document.
+        """
         if self._data is None:
             raise ConfigNotFound
 
-        self._json = json_fragment(json_bytes(self._data))
+        start = perf_counter()
+
+        if isinstance(views := self._data.get('views'), list):
+            data = self._async_encode_views(views)
+        else:
+            data = json_bytes(self._data)
+            self._views_json = []
+
+        self._json = json_fragment(data)
+        self._json_bytes = data
+        self._json_digest = sha1(data).hexdigest()
+
+        if self._state.profile is not None:
+            self._state.profile.serialize = perf_counter() - start
 
         return self._json
 
+    @callback
+    def _async_encode_views(self, views: list[Any]) -> bytes:
+        # the views are written last, so the document ends with the (empty) list
+        head = json_bytes({**{name: value for name, value in self._data.items() if name != 'views'}, 'views': []})
+        parts = [head[:-3], b'[']
+        offset = len(head) - 2
+        previous, self._views_json = self._views_json, []
+        encoded = 0
+
+        for i, view in enumerate(views):
+            if i > 0:
+                parts.append(b',')
+                offset += 1
+
+            if self._json_bytes is not None and i < len(previous) and previous[i][0] is view:
+                part = self._json_bytes[previous[i][1]:previous[i][2]]
+            else:
+                part = json_bytes(view)
+                encoded += 1
+
+            parts.append(part)
+            self._views_json.append((view, offset, offset + len(part)))
+            offset += len(part)
+
+        parts.append(b']}')
+        LOGGER.debug("dashboard \"%s\": serialized %d of %d views", self.url_path, encoded, len(views))
+
+        return b''.join(parts)
+
+    def diagnostics(self) -> dict[str, Any]:
+        return {
+            'mode': self.mode,
+            'loaded': self._data is not None,
+            'reactive': self._state.reactive,
+            'cached_cards': len(self._state.units) + len(self._state.volatile),
+            'profile': self._state.profile.as_dict() if self._state.profile is not None else None,
+        }
+
+
+async def parse__dashboard(
+    hass: HomeAssistant,
+    dashboard: LovelaceConfig,
+    environment: Callable[[DashboardConfig], TemplateEnvironment]|None = None,
+    state: RenderState|None = None,
+    changes: RenderTopics|None = None,
+    source: dict[str, Any]|None = None
+) -> dict[str, Any]:
+    """
+    Render the dashboard, with changes (the entities and registries which changed
+    since the last parse) cards which did not read any of them are reused.
+    """
+    start = perf_counter()
+    source = source if source is not None else await dashboard.async_load(True)
+    # the source is not modified (it is the cached config of the inner dashboard),
+    # rendering copies the containers holding a rendered value and shares the rest
+    data = {name: value for name, value in source.items() if name != 'lovelace_extend'}
+    data['views'] = views = list(data['views'])
+    config = CONFIG_CACHE.get(source['lovelace_extend'] if 'lovelace_extend' in source else {})
+    bytecode = await async_get_bytecode_store(hass) if config.bytecode_cache else None
+    templating = environment(config) if environment is not None else new_template_environment(hass, config)
+    topics = RenderTopics() if config.reactive else None
+    profile = RenderProfile() if config.profile else None
+    # vars are rendered when first read, with the renderer of the views
+    config.vars = vars = DashboardVars(
+        config.vars,
+        DependencyResolver(templating, config.vars, dict(config.get_macros()), config.templates)
+    )
+    render = RenderPass(state if state is not None else RenderState(), templating, config, changes, topics)
+    memo = RenderMemo(render.resolver) if config.memo else None
+
+    if config.executor:
+        renderer = ThreadSafeTemplateRenderer(hass, templating, config.vars, render.resolver, config.native, profile, memo, config.template_budget)
+    else:
+        renderer = TemplateRenderer(templating, config.vars, config.native, profile, memo, config.template_budget)
+
+    vars.render = lambda name, value: parse_value(value, Path(None, ['vars', name]), renderer, topics)
+
+    if config.executor:
+        workers = asyncio.Semaphore(config.workers)
+        budget = RenderBudget(config.budget, None)
+
+        async def render_view(i: int, view: dict[str, Any]) -> None:
+            async with workers:
+                views[i] = await hass.async_add_executor_job(parse_view, view, config, renderer, render, i, budget)
+
+        await asyncio.gather(*[render_view(i, view) for i, view in enumerate(views) if 'type' in view])
+    else:
+        budget = RenderBudget(config.budget)
+
+        for i, view in enumerate(views):
+            if 'type' in view:
+                views[i] = await async_parse_view(view, config, renderer, render, i, budget)
 
-async def parse__dashboard(hass: HomeAssistant, dashboard: LovelaceConfig) -> dict[str, Any]:
+    render.finish()
 
-    data = deepcopy(await dashboard.async_load(True))
-    config = DashboardConfig(data['lovelace_extend'] if 'lovelace_extend' in data else {})
-    templating = new_template_environment(hass, config)
-    vars = config.vars
+    if bytecode is not None:
+        await bytecode.async_save(hass)
 
-    if 'lovelace_extend' in data:
-        del data['lovelace_extend']
+    if profile is not None:
+        profile.parse = perf_counter() - start
 
-    for name, var in vars.items():
-        vars[name] = await parse_card_value(var, Path(None, []), templating)
+    if state is not None:
+        state.profile = profile
 
-    config.vars = vars
+    LOGGER.debug("template cache: %(hits)d hits, %(misses)d misses, %(size)d/%(max_size)d cached", TEMPLATE_CACHE.stats())
 
-    async with asyncio.TaskGroup() as tg:
-        for view in data['views']:
-            if 'type' in view:
-                tg.create_task(parse_card(Path(view['type'], [], config.voter), view, config, templating))
+    if memo is not None:
+        LOGGER.debug("render memo: %d hits, %d templates", memo.hits, len(memo))
 
     return data
 
 
 def new_template_environment(hass: HomeAssistant, config: DashboardConfig) -> TemplateEnvironment:
 
-    environment = TemplateEnvironment(hass, False, False, LOGGER.debug)
+    environment = DashboardEnvironment(hass, False, False, LOGGER.debug)
+
+    if config.bytecode_cache and (bytecode := hass.data.get(DATA_BYTECODE)) is not None:
+        environment.bytecode_cache = bytecode
 
     for name, template in config.get_macros():
         try :
-            environment.globals[name] = getattr(environment.from_string(template).module, name)
+            macro = getattr(compile_template(environment, template, kind='macro').module, name)
+            environment.globals[name] = profile_macro(name, macro) if config.profile else macro
         except TemplateError as err:
             raise HomeAssistantError(f"Error while parsing macro {name} -> {err.message}")
 
@@ -143,55 +644,237 @@ def new_template_environment(hass: HomeAssistant, config: DashboardConfig) -> Te
     return environment
 
 
-async def parse_card(root: Path, options: dict[str, Any], config: DashboardConfig, env: TemplateEnvironment):
+_VIEWS: Final = Path(None, 'views')
 
-    for name, value in options.items():
 
-        vote = root.next(name).get_excluded()
+def parse_view(
+    view: dict[str, Any],
+    config: DashboardConfig,
+    renderer: TemplateRenderer,
+    render: RenderPass,
+    index: int|None = None,
+    budget: RenderBudget|None = None
+) -> dict[str, Any]:
+    holder = [view]
+    walk(view_stack(holder, view, config, render, index), renderer, render, budget)
 
-        if CardPropertyVoter.MATCH_PATH_ALL == (CardPropertyVoter.MATCH_PATH_ALL & vote):
-            break
+    return holder[0]
 
-        if CardPropertyVoter.MATCH_PATH == (CardPropertyVoter.MATCH_PATH & vote):
-            continue
 
-        options[name] = await parse_card_value(value, root.next(name), env, **config.vars)
+async def async_parse_view(
+    view: dict[str, Any],
+    config: DashboardConfig,
+    renderer: TemplateRenderer,
+    render: RenderPass,
+    index: int|None,
+    budget: RenderBudget
+) -> dict[str, Any]:
+    """Render the view on the event loop, yielding to other tasks after every slice of the budget."""
+    holder = [view]
+    stack = view_stack(holder, view, config, render, index)
 
-    for name, value in options.items():
-        # check for nested card
-        if isinstance(value, dict) and 'type' in value:
-            await parse_card(root.new(value['type']), value, config, env)
+    while True:
+        budget.start_slice()
+        walk(stack, renderer, render, budget)
 
-        # check for nested cards
-        if isinstance(value, list) and len(value) > 0 and 'type' in value[0]:
-            for i in range(len(value)):
-                await parse_card(root.new(options[name][i]['type']), options[name][i], config, env)
+        if not stack:
+            return holder[0]
 
+        await asyncio.sleep(0)
 
-async def parse_card_value(data: Any, root: Path, env: TemplateEnvironment, **kwargs: Any) -> Any:
 
-    if isinstance(data, dict):
-        # check for card children
-        if 'type' in data:
-            return data
+def view_stack(holder: list, view: dict[str, Any], config: DashboardConfig, render: RenderPass, index: int|None) -> list['Task']:
+    render.index(view)
+    root = Path(view['type'], [], config.voter, _VIEWS.next(index) if index is not None else None)
 
-        for name, value in data.items():
-            path = root.next(name)
-            if not path.is_excluded():
-                data[name] = await parse_card_value(value, path, env, **kwargs)
+    return [(_CARD, Frame(holder), 0, view, root, None)]
 
-    if isinstance(data, list):
-        for i in range(len(data)):
-            if 'type' in data[i]:
-                continue
-            path = root.next(i)
-            if not path.is_excluded():
-                data[i] = await parse_card_value(data[i], path, env, **kwargs)
 
-    if isinstance(data, str) and is_template_string(data) and not root.is_excluded():
-        try:
-            return literal_eval(env.from_string(data).render(**kwargs))
-        except TemplateError as err:
-            raise HomeAssistantError(f"Error while parsing template on {root} -> {err.message}")
+_CARD: Final = 0
+_VALUE: Final = 1
+_NESTED: Final = 2
+_STORE: Final = 3
+
+
+def parse_card(
+    root: Path,
+    options: dict[str, Any],
+    config: DashboardConfig,
+    env: TemplateEnvironment,
+    render: RenderPass|None = None,
+    renderer: TemplateRenderer|None = None
+) -> dict[str, Any]:
+    """Render the card properties and nested cards, returns the rendered (or reused) card."""
+    holder = [options]
+    walk([(_CARD, Frame(holder), 0, options, root, None)], renderer or TemplateRenderer(env, config.vars, config.native), render)
+
+    return holder[0]
+
+
+def parse_card_value(data: Any, root: Path, env: TemplateEnvironment, **kwargs: Any) -> Any:
+    """Render the templates in a (nested) property value."""
+    return parse_value(data, root, TemplateRenderer(env, kwargs))
+
+
+def parse_value(data: Any, root: Path, renderer: TemplateRenderer, topics: RenderTopics|None = None) -> Any:
+    holder = [data]
+    walk([(_VALUE, Frame(holder), 0, data, root, topics)], renderer, None)
+
+    return holder[0]
+
+
+class Frame:
+    """
+    A container of the source which is copied on the first write, together with
+    the containers holding it. So only the containers (and their ancestors) with
+    a rendered value are copied and everything else is shared with the source.
+    """
+
+    __slots__ = ('source', 'copy', 'parent', 'key')
+
+    def __init__(self, source: dict|list, parent: Self|None = None, key: Any = None) -> None:
+        self.source = source
+        # the root (a holder list created by the walk) is written to directly
+        self.copy = source if parent is None else None
+        self.parent = parent
+        self.key = key
+
+    @property
+    def value(self) -> dict|list:
+        return self.copy if self.copy is not None else self.source
+
+    def set(self, key: Any, value: Any) -> None:
+        frame = self
+
+        # copy the containers up to the first one which is copied already
+        while frame.copy is None:
+            if frame.source[key] is value:
+                return
+
+            frame.copy = frame.source.copy()
+            frame.copy[key] = value
+            frame, key, value = frame.parent, frame.key, frame.copy
+
+        frame.copy[key] = value
+
+
+Task = tuple[int, Frame, Any, Any, Path, RenderTopics|None]
+
+BUDGET_CHECK: Final = 64
+
+
+def walk(stack: list[Task], renderer: TemplateRenderer, render: RenderPass|None, budget: RenderBudget|None = None) -> None:
+    """
+    Walk the tree with an explicit stack, where every entry is a (task, frame,
+    key, node, path, topics) tuple and the result of a task is set as key of the
+    frame of its container. What the templates read is collected in topics (when
+    set), which is passed on to the nested values and cards.
+
+    For a card the nested cards are handled after its properties are rendered, so
+    cards created by templates (like a tile_card macro) are rendered as well.
+
+    Only the values holding templates are visited, as found by the slot index
+    of the render pass (or by checking the direct values without one).
+
+    With a budget it is checked every BUDGET_CHECK tasks, the walk returns (with
+    the remaining tasks on the stack) when the slice of the budget is used.
+    """
+    items = render.slots.items if render is not None else visit_items
+    count = 0
+
+    while stack:
+        task, frame, key, node, path, topics = stack.pop()
+
+        if budget is not None and (count := count + 1) % BUDGET_CHECK == 0 and budget.expired(path):
+            stack.append((task, frame, key, node, path, topics))
+            return
+
+        if task == _VALUE:
+            if isinstance(node, str):
+                if is_template_string(node):
+                    frame.set(key, renderer.render(node, path, topics))
+            elif isinstance(node, dict):
+                # nested cards are rendered as card
+                if 'type' not in node:
+                    own = Frame(node, frame, key)
+
+                    for name, value in items(node):
+                        if not (child := path.next(name)).is_excluded():
+                            visit(stack, renderer, own, name, value, child, topics)
+            elif isinstance(node, list):
+                own = Frame(node, frame, key)
+
+                for i, value in items(node):
+                    if not is_card(value) and not (child := path.next(i)).is_excluded():
+                        visit(stack, renderer, own, i, value, child, topics)
+
+        elif task == _CARD:
+            if render is not None:
+                if (cached := render.lookup(node)) is not None:
+                    frame.set(key, cached)
+                    continue
+
+                if (unit_topics := render.topics(node)) is not None:
+                    topics = unit_topics
+
+            own = Frame(node, frame, key)
+
+            if render is not None:
+                stack.append((_STORE, own, key, node, path, topics))
+
+            stack.append((_NESTED, own, key, node, path, topics))
+
+            # static values are skipped before voting, an excluded card
+            # type matches all properties so this does not change the result
+            for name, value in items(node):
+                vote = (child := path.next(name)).get_excluded() or CardPropertyVoter.MATCH_NONE
+
+                if CardPropertyVoter.MATCH_PATH_ALL == (CardPropertyVoter.MATCH_PATH_ALL & vote):
+                    break
+
+                if CardPropertyVoter.MATCH_PATH == (CardPropertyVoter.MATCH_PATH & vote):
+                    continue
+
+                visit(stack, renderer, own, name, value, child, topics)
+
+        elif task == _NESTED:
+            # the rendered card, properties are rendered before the nested cards
+            card = frame.value
+
+            for name, _ in items(frame.source):
+                if is_card(value := card[name]):
+                    stack.append((_CARD, frame, name, value, path.new(value['type'], path.next(name)), topics))
+                elif isinstance(value, list):
+                    owner = path.next(name)
+                    cards: Frame|None = None
+
+                    for i, item in items(value):
+                        if is_card(item):
+                            cards = cards or Frame(value, frame, name)
+                            stack.append((_CARD, cards, i, item, path.new(item['type'], owner.next(i)), topics))
+
+        else:
+            render.store(node, frame.value)
+
+
+def visit(stack: list[Task], renderer: TemplateRenderer, frame: Frame, key: Any, value: Any, path: Path, topics: RenderTopics|None) -> None:
+    """Render template strings, containers are pushed on the stack."""
+    if isinstance(value, str):
+        frame.set(key, renderer.render(value, path, topics))
+    else:
+        stack.append((_VALUE, frame, key, value, path, topics))
+
+
+def visit_items(node: dict|list) -> list[tuple[Any, Any]]:
+    """Same as SlotIndex.items without an index, only the direct values are checked."""
+    return [(key, value) for key, value in (node.items() if isinstance(node, dict) else enumerate(node)) if is_renderable(value)]
+
+
+def is_renderable(value: Any) -> bool:
+    """Only template strings and containers (which could hold them) have to be visited."""
+    return isinstance(value, (dict, list)) or (isinstance(value, str) and is_template_string(value))
+
+
+def is_card(value: Any) -> bool:
+    return isinstance(value, dict) and 'type' in value
 
-    return data
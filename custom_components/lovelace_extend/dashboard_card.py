@@ -1,7 +1,10 @@
 from abc import ABC, abstractmethod
-from re import Pattern
+from re import Pattern, compile, error
 from typing import Final
 from .const import LOGGER
+import logging
+
+_BACKREF: Final[Pattern] = compile(r"\\[1-9]|\(\?P=")
 
 
 class CardPropertyMatcher(ABC):
@@ -17,6 +20,10 @@ class CardPropertyPathMatcher(CardPropertyMatcher):
     def match(self, path: str) -> bool:
         return self._path == path
 
+    @property
+    def path(self) -> str:
+        return self._path
+
     def __str__(self):
         return self._path
 
@@ -28,6 +35,10 @@ class CardPropertyPatternMatcher(CardPropertyMatcher):
     def match(self, path: str) -> bool:
         return self._regex.search(path) is not None
 
+    @property
+    def regex(self) -> Pattern:
+        return self._regex
+
     def __str__(self):
         return f"<{self._regex.pattern}>"
 
@@ -49,6 +60,14 @@ class CardPropertyVoter:
     def __str__(self):
         return f"[{self._type}]{self._matcher}" if self._matcher is not None else f"[{self._type}]"
 
+    @property
+    def type(self) -> str:
+        return self._type
+
+    @property
+    def matcher(self) -> CardPropertyMatcher|None:
+        return self._matcher
+
     def _match_type(self, type: str) -> int:
         return self.MATCH_TYPE if self._type == self.MATCH_ALL_TYPES or self._type == type else self.MATCH_NONE
 
@@ -69,44 +88,136 @@ class CardPropertyVoter:
         return result
 
 
+class CardPropertyRules:
+    """
+    The voters for a single card type compiled to a path set and one combined
+    regex, so the checks do not grow with the amount of rules.
+
+    Voters are checked in order and the first match wins, so only the path
+    rules defined before the first rule without path (which matches all
+    paths of the card) can make a difference.
+    """
+
+    _paths: dict[str, CardPropertyVoter]
+    _patterns: list[tuple[Pattern, CardPropertyVoter]]
+    _regex: Pattern|None = None
+    _all: CardPropertyVoter|None = None
+
+    def __init__(self, voters: list[CardPropertyVoter]):
+        self._paths = {}
+        self._patterns = []
+
+        for voter in voters:
+            if voter.matcher is None:
+                self._all = voter
+                break
+
+            if isinstance(voter.matcher, CardPropertyPathMatcher):
+                self._paths.setdefault(voter.matcher.path, voter)
+
+            if isinstance(voter.matcher, CardPropertyPatternMatcher):
+                self._patterns.append((voter.matcher.regex, voter))
+
+        self._regex = self._combine([regex for regex, _ in self._patterns])
+
+    @staticmethod
+    def _combine(patterns: list[Pattern]) -> Pattern|None:
+        # back references would point to the wrong group after combining
+        if len(patterns) == 0 or any(_BACKREF.search(p.pattern) is not None for p in patterns):
+            return None
+
+        try:
+            return compile('|'.join(f"(?:{p.pattern})" for p in patterns))
+        except error:
+            return None
+
+    def match(self, path: str) -> tuple[int, CardPropertyVoter|None]:
+
+        if (voter := self._paths.get(path)) is not None:
+            return CardPropertyVoter.MATCH_TYPE | CardPropertyVoter.MATCH_PATH, voter
+
+        if len(self._patterns) > 0 and (self._regex is None or self._regex.search(path) is not None):
+            for regex, voter in self._patterns:
+                if regex.search(path) is not None:
+                    return CardPropertyVoter.MATCH_TYPE | CardPropertyVoter.MATCH_PATH, voter
+
+        if self._all is not None:
+            return CardPropertyVoter.MATCH_TYPE | CardPropertyVoter.MATCH_PATH_ALL, self._all
+
+        return CardPropertyVoter.MATCH_NONE, None
+
+
 class CardPropertyVoteHandler:
     _voters: [CardPropertyVoter] = []
+    _rules: dict[str, CardPropertyRules]
+    _decisions: dict[tuple[str, str], int]
 
     def __init__(self, voters: [CardPropertyVoter]):
         self._voters = voters if None is not voters else []
+        self._rules = {}
+        self._decisions = {}
 
     def register(self, voter: CardPropertyVoter) -> None:
         self._voters.append(voter)
+        self._rules = {}
+        self._decisions = {}
 
     def __repr__(self):
         return f"[{', '.join(map(lambda card: card.__repr__(), self._voters))}]"
 
+    def _get_rules(self, type: str) -> CardPropertyRules:
+        if type not in self._rules:
+            self._rules[type] = CardPropertyRules(
+                [voter for voter in self._voters if voter.type == CardPropertyVoter.MATCH_ALL_TYPES or voter.type == type]
+            )
+
+        return self._rules[type]
+
     def is_excluded(self, type: str, path: str) -> int:
-        result = CardPropertyVoter.MATCH_NONE
+        key = (type, path)
 
-        for voter in self._voters:
-            if (result := voter.match(type, path)) is not CardPropertyVoter.MATCH_NONE:
-                if CardPropertyVoter.MATCH_PATH_ALL == (CardPropertyVoter.MATCH_PATH_ALL & result):
-                    LOGGER.debug(
-                        "card type [%s] ignored by rule \"%s\" (match [%s])",
-                        type,
-                        voter,
-                        result_str(result)
-                    )
-                else:
-                    LOGGER.debug(
-                        "card path [%s].%s ignored by rule \"%s\" (match [%s])",
-                        type,
-                        path,
-                        voter,
-                        result_str(result)
-                    )
-                return result
-
-        LOGGER.debug("card path [%s].%s not excluded (checked %d voters)", type, path, len(self._voters))
+        if key in self._decisions:
+            return self._decisions[key]
+
+        if type == CardPropertyVoter.MATCH_ALL_TYPES:
+            # a voter also matches on type only when the card type is a wildcard
+            result, voter = self._scan(type, path)
+        else:
+            result, voter = self._get_rules(type).match(path)
+
+        self._decisions[key] = result
+
+        if LOGGER.isEnabledFor(logging.DEBUG):
+            self._log(type, path, result, voter)
 
         return result
 
+    def _scan(self, type: str, path: str) -> tuple[int, CardPropertyVoter|None]:
+        for voter in self._voters:
+            if (result := voter.match(type, path)) is not CardPropertyVoter.MATCH_NONE:
+                return result, voter
+
+        return CardPropertyVoter.MATCH_NONE, None
+
+    def _log(self, type: str, path: str, result: int, voter: CardPropertyVoter|None) -> None:
+        if voter is None:
+            LOGGER.debug("card path [%s].%s not excluded (checked %d voters)", type, path, len(self._voters))
+        elif CardPropertyVoter.MATCH_PATH_ALL == (CardPropertyVoter.MATCH_PATH_ALL & result):
+            LOGGER.debug(
+                "card type [%s] ignored by rule \"%s\" (match [%s])",
+                type,
+                voter,
+                result_str(result)
+            )
+        else:
+            LOGGER.debug(
+                "card path [%s].%s ignored by rule \"%s\" (match [%s])",
+                type,
+                path,
+                voter,
+                result_str(result)
+            )
+
 
 def result_str(mode: int) -> str:
     ret: list[str] = []
@@ -1,4 +1,4 @@
-from .const import CARD_PATH_PATTERN
+from .const import CARD_PATH_PATTERN, CONFIG_CACHE_SIZE, REACTIVE_COOLDOWN, RENDER_BUDGET, RENDER_WORKERS, TEMPLATE_BUDGET
 from .dashboard_card import (
     CardPropertyMatcher,
     CardPropertyPathMatcher,
@@ -6,88 +6,117 @@ from .dashboard_card import (
     CardPropertyVoteHandler,
     CardPropertyVoter,
 )
+from collections import OrderedDict
+from functools import lru_cache, partial
+from hashlib import sha1
 from homeassistant.helpers import config_validation as cv
+from json import dumps
 from re import compile, Pattern
-from typing import Any
-from voluptuous import Schema, Optional, Required, Invalid
+from typing import Any, Final
+from voluptuous import All, Coerce, Invalid, Optional, Range, Required, Schema
 
 
-class DashboardConfig:
+def _card_path_voter(pattern: Pattern, value: Any) -> CardPropertyVoteHandler:
 
-    _pattern: Pattern
-    _data: dict[str, Any]
+    if isinstance(value, str):
+        value = [value]
 
-    def __init__(self, config: dict[str, Any], card_patter: Pattern = CARD_PATH_PATTERN):
-        self._pattern = compile(card_patter)
-        self._data = self._config_schema(config)
+    if not isinstance(value, list):
+        raise Invalid(f"expecting list got {type(value)}")
 
-    def _card_path_voter(self, value) -> CardPropertyVoteHandler:
+    voter = CardPropertyVoteHandler(None)
 
-        if isinstance(value, str):
-            value = [value]
+    for v in value:
+        voter.register(Schema(partial(_card_property_matcher, pattern))(v))
 
-        if not isinstance(value, list):
-            Invalid(f"expecting list got {type(value)}")
+    return voter
 
-        voter = CardPropertyVoteHandler(None)
 
-        for v in value:
-            voter.register(Schema(self._card_property_matcher)(v))
+def _card_property_matcher(pattern: Pattern, value: str) -> CardPropertyVoter:
 
-        return voter
+    regex = pattern.match(value)
 
-    def _card_property_matcher(self, value: str) -> CardPropertyVoter:
+    if regex is None:
+        raise Invalid(f"Invalid card path \"{value}\", expecting [card-type]path|<regex>")
 
-        regex = self._pattern.match(value)
+    group: dict = regex.groupdict()
+    match: CardPropertyMatcher|None = None
 
-        if regex is None:
-            raise Invalid(f"Invalid card path \"{value}\", expecting [card-type]path|<regex>")
+    if group['regex'] is not None:
+        try:
+            match = CardPropertyPatternMatcher(compile(group['regex']))
+        except Exception as e:
+            raise Invalid(f"Invalid card path pattern \"{group['regex']}\" ({e.__str__()})")
 
-        group: dict = regex.groupdict()
-        match: CardPropertyMatcher|None = None
+    if group['path'] is not None:
+        match = CardPropertyPathMatcher(group['path'])
 
-        if group['regex'] is not None:
-            try:
-                match = CardPropertyPatternMatcher(compile(group['regex']))
-            except Exception as e:
-                raise Invalid(f"Invalid card path pattern \"{group['regex']}\" ({e.__str__()})")
+    return CardPropertyVoter(group['type'], match)
 
-        if group['path'] is not None:
-            match = CardPropertyPathMatcher(group['path'])
 
-        return CardPropertyVoter(group['type'], match)
+def _macro_value(data) -> dict[str, str|list]:
+    if isinstance(data, str):
+        data = {
+            'content': data
+        }
 
-    @staticmethod
-    def _slug_name(my_key) -> str:
-        return Schema(cv.slug)(my_key)
+    return MACRO_SCHEMA(data)
 
-    def _macro_value(self, data) -> dict[str, str|list]:
-        if isinstance(data, str):
-            data = {
-                'content': data
-            }
 
-        return self._macro_schema(data)
+MACRO_SCHEMA: Final = Schema({
+    Optional('args', default=[]): cv.ensure_list_csv,
+    Required('content'):          cv.string,
+})
 
-    @property
-    def _macro_schema(self) -> Schema:
-        return Schema({
-            Optional('args', default=[]): cv.ensure_list_csv,
-            Required('content'):          cv.string,
-        })
+RENDER_SCHEMA: Final = Schema({
+    Optional('executor', default=False):         cv.boolean,
+    # a semaphore without workers would never start a view
+    Optional('workers', default=RENDER_WORKERS): All(Coerce(int), Range(min=1)),
+    Optional('native', default=True):            cv.boolean,
+    Optional('reactive', default=False):         cv.boolean,
+    Optional('cooldown', default=REACTIVE_COOLDOWN): cv.positive_float,
+    Optional('profile', default=False):          cv.boolean,
+    Optional('bytecode_cache', default=False):   cv.boolean,
+    Optional('memo', default=False):             cv.boolean,
+    Optional('budget', default=RENDER_BUDGET):   cv.positive_float,
+    Optional('template_budget', default=TEMPLATE_BUDGET): cv.positive_float,
+})
 
-    @property
-    def _config_schema(self) -> Schema:
-        return Schema({
-            Optional('vars'):                           dict[str, str | int | bool | list | dict],
-            Optional('excludes', default=['[*]type']):  self._card_path_voter,
-            Optional('templates'):                      {
-                self._slug_name: str
-            },
-            Optional('macros'):                         {
-                self._slug_name: self._macro_value
-            },
-        })
+
+@lru_cache(maxsize=None)
+def config_schema(card_pattern: str = CARD_PATH_PATTERN) -> Schema:
+    """Schema of the lovelace_extend block, built once per card path pattern."""
+    return Schema({
+        Optional('vars'):                           dict[str, str | int | bool | list | dict],
+        Optional('excludes', default=['[*]type']):  partial(_card_path_voter, compile(card_pattern)),
+        Optional('templates'):                      {
+            cv.slug: str
+        },
+        Optional('macros'):                         {
+            cv.slug: _macro_value
+        },
+        Optional('render'):                         RENDER_SCHEMA,
+    })
+
+
+class DashboardConfig:
+
+    _data: dict[str, Any]
+
+    def __init__(self, config: dict[str, Any], card_patter: str = CARD_PATH_PATTERN):
+        self._data = config_schema(card_patter)(config)
+        self._excludes = config['excludes'] if 'excludes' in config else None
+
+        if 'render' not in self._data:
+            self._data['render'] = RENDER_SCHEMA({})
+
+    def copy(self) -> 'DashboardConfig':
+        """Shallow copy, so setting the vars of a render does not change the (cached) config."""
+        config = DashboardConfig.__new__(DashboardConfig)
+        config._data = dict(self._data)
+        config._excludes = self._excludes
+
+        return config
 
     @property
     def voter(self) -> CardPropertyVoteHandler:
@@ -109,10 +138,125 @@ class DashboardConfig:
     def macros(self) -> dict[str, dict[str, str]]:
         return self._data['macros'] if 'macros' in self._data else {}
 
+    @property
+    def render(self) -> dict[str, Any]:
+        return self._data['render']
+
+    @property
+    def executor(self) -> bool:
+        """Render the views in worker threads instead of on the event loop."""
+        return self.render['executor']
+
+    @property
+    def workers(self) -> int:
+        return self.render['workers']
+
+    @property
+    def native(self) -> bool:
+        """Use the value of single expression templates instead of parsing their output."""
+        return self.render['native']
+
+    @property
+    def reactive(self) -> bool:
+        """Render cards again when the entities or registries their templates read change."""
+        return self.render['reactive']
+
+    @property
+    def cooldown(self) -> float:
+        """Minimal seconds between reactive renders."""
+        return self.render['cooldown']
+
+    @property
+    def profile(self) -> bool:
+        """Record the render time and output size of the templates and macros."""
+        return self.render['profile']
+
+    @property
+    def bytecode_cache(self) -> bool:
+        """Keep the bytecode of the compiled templates on disk, for faster renders after a restart."""
+        return self.render['bytecode_cache']
+
+    @property
+    def memo(self) -> bool:
+        """Render templates which occur more than once (and do not read state, time or random) once per render."""
+        return self.render['memo']
+
+    @property
+    def budget(self) -> float:
+        """Seconds a render of the dashboard may take, 0 to disable."""
+        return self.render['budget']
+
+    @property
+    def template_budget(self) -> float:
+        """Seconds a single template may take, 0 to disable."""
+        return self.render['template_budget']
+
+    @property
+    def environment_key(self) -> str:
+        """Dashboards with the same key can share a template environment."""
+        return f"{self.template_key}/{self.profile}/{self.bytecode_cache}"
+
+    @property
+    def template_key(self) -> str:
+        """Fingerprint of the macros and templates, used to share and invalidate compiled templates."""
+        return sha1(dumps([self.macros, self.templates], sort_keys=True).encode()).hexdigest()
+
+    @property
+    def excludes_key(self) -> str:
+        """Fingerprint of the exclude rules as defined in the config."""
+        return sha1(dumps(self._excludes, sort_keys=True).encode()).hexdigest()
+
     def add_sources(self, source: dict[str, str]):
         for name, template in self.templates.items():
             source[name] = template
 
     def get_macros(self):
         for name, macro in self.macros.items():
-            yield name, f"{{% macro {name}({', '.join(macro['args'])}) %}}{macro['content']}{{% endmacro %}}"
\ No newline at end of file
+            yield name, f"{{% macro {name}({', '.join(macro['args'])}) %}}{macro['content']}{{% endmacro %}}"
+
+class ConfigCache:
+    """
+    LRU cache of the validated configs (with the compiled exclude rules), keyed
+    by a fingerprint of the lovelace_extend block.
+    """
+
+    _entries: OrderedDict[str, DashboardConfig]
+
+    def __init__(self, size: int = CONFIG_CACHE_SIZE) -> None:
+        self._size = size
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, config: dict[str, Any]) -> DashboardConfig:
+        try:
+            key = sha1(dumps(config, sort_keys=True, default=repr).encode()).hexdigest()
+        except TypeError:
+            # mixed key types can not be sorted
+            return DashboardConfig(config)
+
+        if (entry := self._entries.get(key)) is not None:
+            self.hits += 1
+            self._entries.move_to_end(key)
+        else:
+            self.misses += 1
+            self._entries[key] = entry = DashboardConfig(config)
+
+            if len(self._entries) > self._size:
+                self._entries.popitem(last=False)
+
+        return entry.copy()
+
+    def stats(self) -> dict[str, int]:
+        return {
+            'size': len(self._entries),
+            'max_size': self._size,
+            'hits': self.hits,
+            'misses': self.misses,
+        }
+
+
+CONFIG_CACHE: Final = ConfigCache()
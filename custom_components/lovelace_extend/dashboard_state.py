@@ -0,0 +1,457 @@
+from .const import INCREMENTAL_DEPTH, REACTIVE_COOLDOWN
+from .dashboard_card import CardPropertyVoter
+from .dashboard_config import DashboardConfig
+from .path import Path
+from .profile import RenderProfile
+from .template import DashboardVars, DependencyResolver, RenderTopics
+from hashlib import sha1
+from homeassistant.helpers.template import TemplateEnvironment, is_template_string
+from json import dumps
+from typing import Any
+
+
+def _is_card(value: Any) -> bool:
+    return isinstance(value, dict) and 'type' in value
+
+
+def fingerprint(value: Any) -> str:
+    try:
+        data = dumps(value, sort_keys=True, default=repr).encode()
+    except (TypeError, RecursionError):
+        # mixed key types can not be sorted, deeply nested cards are too deep for json
+        data = encode(value)
+
+    return sha1(data).hexdigest()
+
+
+class _Token(bytes):
+    pass
+
+
+def encode(value: Any) -> bytes:
+    """Encode the value with sorted keys, with an explicit stack so the nesting is not limited."""
+    parts: list[bytes] = []
+    stack: list[Any] = [value]
+
+    while stack:
+        node = stack.pop()
+
+        if isinstance(node, _Token):
+            parts.append(node)
+        elif isinstance(node, dict):
+            parts.append(b'{')
+            stack.append(_Token(b'}'))
+
+            for key, item in sorted(node.items(), key=lambda item: repr(item[0]), reverse=True):
+                stack.extend((item, _Token(repr(key).encode() + b':')))
+        elif isinstance(node, (list, tuple)):
+            parts.append(b'[')
+            stack.append(_Token(b']'))
+
+            for item in reversed(node):
+                stack.extend((item, _Token(b',')))
+        else:
+            parts.append(repr(node).encode())
+
+    return b''.join(parts)
+
+
+class RenderState:
+    """Rendered cards of the previous parse, keyed by the fingerprint of their source."""
+
+    units: dict[str, Any]
+    volatile: dict[str, tuple[Any, RenderTopics]]
+    topics: RenderTopics
+    reactive: bool = False
+    cooldown: float = REACTIVE_COOLDOWN
+    profile: RenderProfile|None
+    slots: 'SlotIndex'
+
+    def __init__(self) -> None:
+        self.clear()
+
+    def clear(self) -> None:
+        self.units = {}
+        # cards reading states or registries with what they read, only kept for reactive dashboards
+        self.volatile = {}
+        self.topics = RenderTopics()
+        # profile of the last parse, when enabled
+        self.profile = None
+        self.slots = SlotIndex()
+
+    def dump(self, config: dict[str, Any]) -> dict[str, Any]:
+        """Export the state for storage, cards are referenced by their location in the rendered config."""
+        locations: dict[int, list[str|int]] = {}
+        locate(config, locations)
+
+        return {
+            'units': {key: locations[id(node)] for key, node in self.units.items() if id(node) in locations},
+            'volatile': {
+                key: {'path': locations[id(node)], **topics.as_dict()}
+                for key, (node, topics) in self.volatile.items() if id(node) in locations
+            },
+            'topics': self.topics.as_dict(),
+            'reactive': self.reactive,
+            'cooldown': self.cooldown,
+        }
+
+    def load(self, data: dict[str, Any], config: dict[str, Any]) -> None:
+        """Restore the state exported with dump for the (stored) rendered config."""
+        self.clear()
+
+        for key, path in data.get('units', {}).items():
+            if (node := resolve(config, path)) is not None:
+                self.units[key] = node
+
+        for key, item in data.get('volatile', {}).items():
+            if (node := resolve(config, item['path'])) is not None:
+                self.volatile[key] = (node, RenderTopics.from_dict(item))
+
+        self.topics = RenderTopics.from_dict(data.get('topics', {}))
+        self.reactive = data.get('reactive', False)
+        self.cooldown = data.get('cooldown', REACTIVE_COOLDOWN)
+
+
+class SlotIndex:
+    """
+    Index of the values to visit in the containers of the source: template
+    strings, cards and containers holding them, so static values (like a list
+    of entity ids or a card without templates) are skipped. A container is
+    indexed once, the index is kept as long as render passes use the container.
+    """
+
+    _current: dict[int, tuple[Any, list[tuple[Any, Any]]]]
+    _previous: dict[int, tuple[Any, list[tuple[Any, Any]]]]
+
+    def __init__(self) -> None:
+        self._current = {}
+        self._previous = {}
+
+    def __len__(self) -> int:
+        return len(self._current)
+
+    def items(self, node: dict|list) -> list[tuple[Any, Any]]:
+        """The (key, value) pairs of the container which hold a template or card."""
+        # the entry keeps a reference to the node, so the id can not be reused
+        if (entry := self._current.get(id(node))) is not None and entry[0] is node:
+            return entry[1]
+
+        return self._index(node)
+
+    def rotate(self) -> None:
+        """Called after a render pass, containers not used by the last two passes are dropped."""
+        self._previous = self._current
+        self._current = {}
+
+    def _indexed(self, node: dict|list) -> list[tuple[Any, Any]]|None:
+        if (entry := self._current.get(id(node))) is not None and entry[0] is node:
+            return entry[1]
+
+        if (entry := self._previous.get(id(node))) is not None and entry[0] is node:
+            self._current[id(node)] = entry
+            return entry[1]
+
+        return None
+
+    def _index(self, node: dict|list) -> list[tuple[Any, Any]]:
+        # post-order with an explicit stack, so a container is indexed after the containers it holds
+        stack: list[tuple[dict|list, bool]] = [(node, False)]
+
+        while stack:
+            container, visited = stack.pop()
+
+            if self._indexed(container) is not None:
+                continue
+
+            values = container.items() if isinstance(container, dict) else enumerate(container)
+
+            if not visited:
+                stack.append((container, True))
+                stack.extend((value, False) for _, value in values if isinstance(value, (dict, list)))
+                continue
+
+            slots = []
+
+            for key, value in values:
+                if isinstance(value, str):
+                    if is_template_string(value):
+                        slots.append((key, value))
+                elif isinstance(value, (dict, list)) and len(self._current[id(value)][1]) > 0:
+                    # containers and cards without templates are left as is
+                    slots.append((key, value))
+
+            self._current[id(container)] = (container, slots)
+
+        return self._current[id(node)][1]
+
+
+def locate(node: Any, locations: dict[int, list[str|int]]) -> None:
+    """Find the locations of the cards nested up to INCREMENTAL_DEPTH."""
+    # (node, path, depth) in the order of a depth first walk, so a shared card gets its first location
+    stack: list[tuple[Any, list[str|int], int]] = [(node, [], 0)]
+
+    while stack:
+        node, path, depth = stack.pop()
+
+        if isinstance(node, dict):
+            if 'type' in node:
+                if depth > INCREMENTAL_DEPTH:
+                    continue
+
+                locations.setdefault(id(node), path)
+                depth += 1
+
+            items = node.items()
+        else:
+            items = enumerate(node)
+
+        stack.extend(reversed([(value, [*path, key], depth) for key, value in items if isinstance(value, (dict, list))]))
+
+
+def resolve(node: Any, path: list[str|int]) -> Any:
+    try:
+        for key in path:
+            node = node[key]
+    except (KeyError, IndexError, TypeError):
+        return None
+
+    return node if isinstance(node, dict) else None
+
+
+class _Unit:
+    __slots__ = ('key', 'node', 'volatile', 'registry', 'parent')
+
+    def __init__(self, key: str, node: dict[str, Any], volatile: bool, registry: bool, parent: int|None) -> None:
+        self.key = key
+        # keep a reference to the node, so its id is not reused while rendering
+        self.node = node
+        self.volatile = volatile
+        self.registry = registry
+        self.parent = parent
+
+
+class RenderPass:
+    """
+    Tracks the card fingerprints for one parse so unchanged cards can be taken from the previous parse.
+
+    Cards reading states or registries are rendered again, unless this is a reactive
+    pass (with the changed entities and registries) and the card did not read any of them.
+    """
+
+    _units: dict[int, _Unit]
+    _rendered: dict[str, Any]
+    _volatile: dict[str, tuple[Any, RenderTopics]]
+    _topics: dict[int, RenderTopics]
+
+    def __init__(
+        self,
+        state: RenderState,
+        env: TemplateEnvironment,
+        config: DashboardConfig,
+        changes: RenderTopics|None = None,
+        topics: RenderTopics|None = None
+    ) -> None:
+        self._state = state
+        self._changes = changes
+        self._reactive = config.reactive
+        self._cooldown = config.cooldown
+        self._units = {}
+        self._rendered = {}
+        self._volatile = {}
+        self._topics = {}
+        self._vars_topics = topics if topics is not None else RenderTopics()
+        self.slots = state.slots
+        if isinstance(config.vars, DashboardVars):
+            self.resolver = config.vars.resolver
+        else:
+            self.resolver = DependencyResolver(env, config.vars, dict(config.get_macros()), config.templates)
+
+        # fingerprinted when a card reads the var, as that renders the var
+        self._vars = config.vars
+        self._fingerprints: dict[str, str] = {}
+        self._salt = config.excludes_key
+        self._voter = config.voter
+        self._library = config.template_key
+
+    def index(self, view: dict[str, Any]) -> None:
+        """Fingerprint the view and the cards nested up to INCREMENTAL_DEPTH before it is rendered."""
+        self._collect_cards(view, Path(view['type'], [], self._voter))
+
+    def _collect_cards(self, view: dict[str, Any], path: Path) -> None:
+        """
+        Collect the templates rendered for every card and its nested cards, and
+        register the cards nested up to INCREMENTAL_DEPTH. Like the walk, excluded
+        properties are skipped, so a template which is never rendered (like a
+        states() in the content of an excluded markdown card) does not make the
+        card volatile.
+        """
+        # (card, depth, parent, path, templates of the units holding it)
+        stack: list[tuple[dict[str, Any], int, int|None, Path, tuple[set[str], ...]]] = [(view, 0, None, path, ())]
+        units: list[tuple[dict[str, Any], set[str], int|None]] = []
+
+        while stack:
+            card, depth, parent, path, holders = stack.pop()
+            owner = parent
+
+            if depth <= INCREMENTAL_DEPTH:
+                owner = id(card)
+                units.append((card, templates := set(), parent))
+                holders = (*holders, templates)
+
+            items = self.slots.items(card)
+
+            # nested cards are rendered whether or not the card is excluded
+            for name, value in items:
+                if _is_card(value):
+                    stack.append((value, depth + 1, owner, path.new(value['type']), holders))
+                elif isinstance(value, list):
+                    for _, item in self.slots.items(value):
+                        if _is_card(item):
+                            stack.append((item, depth + 1, owner, path.new(item['type']), holders))
+
+            for name, value in items:
+                vote = (child := path.next(name)).get_excluded() or CardPropertyVoter.MATCH_NONE
+
+                if CardPropertyVoter.MATCH_PATH_ALL == (CardPropertyVoter.MATCH_PATH_ALL & vote):
+                    break
+
+                if CardPropertyVoter.MATCH_PATH == (CardPropertyVoter.MATCH_PATH & vote):
+                    continue
+
+                if found := self._collect_value(value, child):
+                    for templates in holders:
+                        templates.update(found)
+
+        # nested cards are registered before their parent
+        for card, templates, parent in reversed(units):
+            self._register(card, templates, parent)
+
+    def _collect_value(self, value: Any, path: Path) -> set[str]:
+        templates: set[str] = set()
+        stack = [(value, path)]
+
+        while stack:
+            node, path = stack.pop()
+
+            if isinstance(node, str):
+                if is_template_string(node):
+                    templates.add(node)
+            # cards are collected by _collect_cards (as the walk renders them as card)
+            elif isinstance(node, dict) and 'type' not in node:
+                for name, value in self.slots.items(node):
+                    if not (child := path.next(name)).is_excluded():
+                        stack.append((value, child))
+            elif isinstance(node, list):
+                for i, value in self.slots.items(node):
+                    if not _is_card(value) and not (child := path.next(i)).is_excluded():
+                        stack.append((value, child))
+
+        return templates
+
+    def _register(self, node: dict[str, Any], templates: set[str], parent: int|None) -> None:
+        vars: set[str] = set()
+        library = False
+        volatile = False
+        registry = False
+
+        for template in templates:
+            dependencies = self.resolver.resolve(template)
+            vars.update(dependencies.vars)
+            library |= dependencies.library
+            volatile |= dependencies.volatile
+            registry |= dependencies.registry
+
+        if volatile and not self._reactive:
+            return
+
+        key = fingerprint([
+            self._salt,
+            self._library if library else None,
+            [(name, self._fingerprint(name)) for name in sorted(vars)],
+            node,
+        ])
+
+        self._units[id(node)] = _Unit(key, node, volatile, registry, parent)
+
+    def _fingerprint(self, name: str) -> str:
+        if name not in self._fingerprints:
+            self._fingerprints[name] = fingerprint(self._vars[name])
+
+        return self._fingerprints[name]
+
+    def lookup(self, node: dict[str, Any]) -> dict[str, Any]|None:
+        """Return the rendered card from the previous parse when its source is unchanged."""
+        if (unit := self._units.get(id(node))) is None:
+            return None
+
+        if not unit.volatile:
+            if unit.key not in self._state.units:
+                return None
+
+            self._rendered[unit.key] = self._state.units[unit.key]
+
+            return self._rendered[unit.key]
+
+        if self._changes is None or unit.key not in self._state.volatile:
+            return None
+
+        output, topics = self._state.volatile[unit.key]
+
+        if topics.intersects(self._changes):
+            return None
+
+        self._volatile[unit.key] = (output, topics)
+        self._topics[id(node)] = topics
+
+        return output
+
+    def topics(self, node: dict[str, Any]) -> RenderTopics|None:
+        """New topics to collect what the card reads while it is rendered, None when the card is not tracked."""
+        if (unit := self._units.get(id(node))) is None or not unit.volatile:
+            return None
+
+        self._topics[id(node)] = RenderTopics(unit.registry)
+
+        return self._topics[id(node)]
+
+    def store(self, node: dict[str, Any], output: dict[str, Any]) -> None:
+        """Keep the rendered output of the (source) card for the next parse."""
+        if (unit := self._units.get(id(node))) is None:
+            return
+
+        if unit.volatile:
+            self._volatile[unit.key] = (output, self._topics[id(node)])
+        else:
+            self._rendered[unit.key] = output
+
+    def finish(self) -> None:
+        for node, unit in self._units.items():
+            # cards nested in a reused card were not visited, but are still part of the output
+            if not unit.volatile:
+                if unit.key not in self._rendered and unit.key in self._state.units:
+                    self._rendered[unit.key] = self._state.units[unit.key]
+                continue
+
+            if unit.key not in self._volatile:
+                if unit.key not in self._state.volatile:
+                    continue
+
+                self._volatile[unit.key] = self._state.volatile[unit.key]
+                self._topics[node] = self._state.volatile[unit.key][1]
+
+            # a card depends on what its nested cards read, units are registered children first
+            if unit.parent is not None and unit.parent in self._topics and node in self._topics:
+                self._topics[unit.parent].update(self._topics[node])
+
+        topics = RenderTopics()
+        topics.update(self._vars_topics)
+
+        for _, unit_topics in self._volatile.values():
+            topics.update(unit_topics)
+
+        self._state.units = self._rendered
+        self._state.volatile = self._volatile
+        self._state.topics = topics
+        self._state.reactive = self._reactive
+        self._state.cooldown = self._cooldown
+        self._state.slots.rotate()
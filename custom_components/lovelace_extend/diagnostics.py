@@ -0,0 +1,23 @@
+from .dashboard import LovelaceWrapper
+from .dashboard_config import CONFIG_CACHE
+from .template import ENVIRONMENTS, TEMPLATE_CACHE
+from homeassistant.components.lovelace.const import DOMAIN as LOVELACE_DOMAIN
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+from typing import Any
+
+
+async def async_get_config_entry_diagnostics(hass: HomeAssistant, entry: ConfigEntry) -> dict[str, Any]:
+    """Diagnostics of the managed dashboards, with the render profile for the dashboards which enabled it."""
+    dashboards = hass.data[LOVELACE_DOMAIN]['dashboards'] if LOVELACE_DOMAIN in hass.data else {}
+
+    return {
+        'entry': dict(entry.data),
+        'config_cache': CONFIG_CACHE.stats(),
+        'template_cache': TEMPLATE_CACHE.stats(),
+        'environments': ENVIRONMENTS.stats(),
+        'dashboards': {
+            name: dashboard.diagnostics()
+            for name, dashboard in dashboards.items() if isinstance(dashboard, LovelaceWrapper)
+        },
+    }
@@ -1,44 +1,84 @@
-from copy import copy
+from sys import intern
 from typing import Self
 from .dashboard_card import CardPropertyVoteHandler, CardPropertyVoter
 
 class Path:
+    """
+    Property path of a card, linked to its parent so descending into a
+    property does not copy the path. The string form (like cards[0].name)
+    is only built when needed and cached on the node.
 
-    _path_fmt: str | None = None
-    _path: list[str]
+    The string form is relative to the card (as used by the excludes), a card
+    path can be linked to the property path of the card in its parent (owner)
+    to get its location in the dashboard.
+    """
+
+    __slots__ = ('_parent', '_name', '_type', '_voter', '_str', '_owner')
+
+    _parent: Self|None
+    _name: str|int|None
     _type: str|None
-    _voter: CardPropertyVoteHandler|None = None
+    _voter: CardPropertyVoteHandler|None
+    _str: str|None
+    _owner: Self|None
 
-    def __init__(self, type: str|None, root: str | list, voter: CardPropertyVoteHandler|None = None):
-        self._path = [root] if isinstance(root, str) else root
+    def __init__(self, type: str|None, root: str | list | None = None, voter: CardPropertyVoteHandler|None = None, owner: Self|None = None):
+        self._parent = None
+        self._name = None
         self._type = type
         self._voter = voter
+        self._str = root if isinstance(root, str) else '.'.join(root or [])
+        self._owner = owner
 
     def __str__(self) -> str:
-        return '.'.join(self._path)
+        if self._str is None:
+            parent = str(self._parent)
 
-    def new(self, type: str) -> Self:
-        return Path(type, [], self._voter)
+            if isinstance(self._name, int):
+                self._str = f"{parent}[{self._name}]"
+            elif parent == '':
+                self._str = self._name
+            else:
+                self._str = f"{parent}.{self._name}"
 
-    def next(self, x: int|str) -> Self:
+        return self._str
+
+    @property
+    def type(self) -> str|None:
+        return self._type
 
-        paths = copy(self._path)
+    @property
+    def root(self) -> Self:
+        """The path of the card this property belongs to."""
+        root = self
 
-        if isinstance(x, int):
+        while root._parent is not None:
+            root = root._parent
 
-            if self._path_fmt is None:
-                self._path_fmt = self._path[-1] + "[{idx:n}]"
+        return root
 
-            paths = paths[:-1]
-            paths.append(self._path_fmt.format(idx=x))
-        else:
+    def location(self) -> str:
+        """The path including the paths of the parent cards, like views[0].cards[1].cards[0].name"""
+        path = str(self)
 
-            if self._path_fmt is not None:
-                self._path_fmt = None
+        if (owner := self.root._owner) is None:
+            return path
 
-            paths.append(x)
+        return owner.location() if path == '' else f"{owner.location()}.{path}"
+
+    def new(self, type: str, owner: Self|None = None) -> Self:
+        return Path(type, None, self._voter, owner)
+
+    def next(self, x: int|str) -> Self:
+        path = Path.__new__(Path)
+        path._parent = self
+        path._name = x if isinstance(x, int) else intern(x)
+        path._type = self._type
+        path._voter = self._voter
+        path._str = None
+        path._owner = None
 
-        return Path(self._type, paths, self._voter)
+        return path
 
     def get_excluded(self) -> int|None:
         return self._voter.is_excluded(self._type, str(self)) if self._voter is not None else None
@@ -0,0 +1,113 @@
+from .const import PROFILE_TOP
+from contextvars import ContextVar
+from threading import Lock
+from time import perf_counter
+from typing import Any, Callable
+
+# the profile of the template being rendered, so the macros it calls are added to it
+profile_cv: ContextVar['RenderProfile|None'] = ContextVar('lovelace_extend_profile', default=None)
+
+
+class _Stats:
+
+    __slots__ = ('calls', 'time', 'max', 'size')
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.time = 0.0
+        self.max = 0.0
+        self.size = 0
+
+    def add(self, elapsed: float, size: int) -> None:
+        self.calls += 1
+        self.time += elapsed
+        self.max = max(self.max, elapsed)
+        self.size += size
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            'calls': self.calls,
+            'time_ms': round(self.time * 1000, 3),
+            'max_ms': round(self.max * 1000, 3),
+            'size': self.size,
+        }
+
+
+class RenderProfile:
+    """
+    Render time, calls and output size of a render pass per template path, card,
+    template source and macro, plus the total parse and serialize time.
+    """
+
+    paths: dict[str, _Stats]
+    cards: dict[str, _Stats]
+    templates: dict[str, _Stats]
+    macros: dict[str, _Stats]
+    parse: float|None = None
+    serialize: float|None = None
+
+    def __init__(self, top: int = PROFILE_TOP) -> None:
+        self.top = top
+        self.paths = {}
+        self.cards = {}
+        self.templates = {}
+        self.macros = {}
+        self._lock = Lock()
+
+    def record(self, path: Any, source: str, elapsed: float, result: Any) -> None:
+        size = len(str(result))
+
+        if hasattr(path, 'location'):
+            location, card = path.location(), path.root.location()
+
+            if path.type is not None:
+                card = f"{card} ({path.type})"
+        else:
+            location = card = str(path)
+
+        with self._lock:
+            for stats, key in ((self.paths, location), (self.cards, card), (self.templates, source)):
+                if key not in stats:
+                    stats[key] = _Stats()
+
+                stats[key].add(elapsed, size)
+
+    def record_macro(self, name: str, elapsed: float, result: Any) -> None:
+        with self._lock:
+            if name not in self.macros:
+                self.macros[name] = _Stats()
+
+            self.macros[name].add(elapsed, len(str(result)))
+
+    def as_dict(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                'parse_ms': None if self.parse is None else round(self.parse * 1000, 3),
+                'serialize_ms': None if self.serialize is None else round(self.serialize * 1000, 3),
+                'slowest_templates': [
+                    {'template': source, **stats.as_dict()}
+                    for source, stats in _sorted(self.templates)[:self.top]
+                ],
+                'macros': {name: stats.as_dict() for name, stats in _sorted(self.macros)},
+                'cards': {card: stats.as_dict() for card, stats in _sorted(self.cards)},
+                'paths': {path: stats.as_dict() for path, stats in _sorted(self.paths)},
+            }
+
+
+def _sorted(stats: dict[str, _Stats]) -> list[tuple[str, _Stats]]:
+    return sorted(stats.items(), key=lambda item: item[1].time, reverse=True)
+
+
+def profile_macro(name: str, macro: Callable[..., Any]) -> Callable[..., Any]:
+    """Wrap the macro so its calls are recorded in the profile of the template calling it."""
+    def call(*args: Any, **kwargs: Any) -> Any:
+        if (profile := profile_cv.get()) is None:
+            return macro(*args, **kwargs)
+
+        start = perf_counter()
+        result = macro(*args, **kwargs)
+        profile.record_macro(name, perf_counter() - start, result)
+
+        return result
+
+    return call
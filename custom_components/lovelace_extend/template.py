@@ -0,0 +1,776 @@
+from .const import RENDER_SLICE, TEMPLATE_CACHE_SIZE
+from .profile import RenderProfile, profile_cv
+from ast import literal_eval
+from collections import OrderedDict
+from homeassistant.core import HomeAssistant
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers.template import RenderInfo, TemplateEnvironment, is_template_string
+from homeassistant.util.async_ import run_callback_threadsafe
+from jinja2 import Environment, Template, Undefined, nodes
+from jinja2.environment import TemplateExpression
+from jinja2.defaults import DEFAULT_FILTERS, DEFAULT_NAMESPACE, DEFAULT_TESTS
+from jinja2.exceptions import TemplateError
+from contextvars import ContextVar
+from jinja2.meta import TrackingCodeGenerator, find_referenced_templates
+from threading import Lock
+from time import monotonic, perf_counter
+from typing import Any, Callable, Iterable, Iterator, Mapping, NamedTuple
+from weakref import WeakKeyDictionary
+
+try:
+    from homeassistant.helpers.template import render_info_cv
+except ImportError:
+    # releases before it was made public (like 2024.12 and 2025.4) only have the private name
+    from homeassistant.helpers.template import _render_info as render_info_cv
+
+# deadline (and budget) of the template being rendered
+deadline_cv: ContextVar[tuple[float, float]|None] = ContextVar('lovelace_extend_deadline', default=None)
+# dashboard vars being rendered (by the current thread)
+reading_cv: ContextVar[tuple[str, ...]] = ContextVar('lovelace_extend_reading', default=())
+
+# names which render the same for the same input, everything else (like states,
+# now or device_entities) depends on state outside the dashboard config.
+PURE_GLOBALS: frozenset[str] = frozenset(DEFAULT_NAMESPACE) - {'lipsum'}
+PURE_FILTERS: frozenset[str] = frozenset(DEFAULT_FILTERS) - {'random'} | {
+    # filters of home assistant which only read their input
+    'acos', 'add', 'as_datetime', 'as_timestamp', 'asin', 'atan', 'atan2', 'average',
+    'base64_decode', 'base64_encode', 'bitwise_and', 'bitwise_or', 'bitwise_xor',
+    'contains', 'cos', 'flatten', 'from_json', 'iif', 'is_number', 'log', 'md5',
+    'median', 'multiply', 'ord', 'ordinal', 'pack', 'regex_findall', 'regex_findall_index',
+    'regex_match', 'regex_replace', 'regex_search', 'sha1', 'sha256', 'sha512', 'sin',
+    'slugify', 'sqrt', 'statistical_mode', 'tan', 'to_json', 'unpack', 'version',
+}
+PURE_TESTS: frozenset[str] = frozenset(DEFAULT_TESTS) | {
+    'contains', 'datetime', 'is_number', 'list', 'match', 'search', 'set', 'string', 'tuple',
+}
+# functions and filters which read the entity, device, area, floor or label registry
+REGISTRY_FUNCTIONS: frozenset[str] = frozenset({
+    'area_devices', 'area_entities', 'area_id', 'area_name', 'areas',
+    'device_attr', 'device_entities', 'device_id', 'device_name', 'is_device_attr',
+    'floor_areas', 'floor_entities', 'floor_id', 'floor_name', 'floors',
+    'integration_entities', 'label_areas', 'label_devices', 'label_entities',
+    'label_id', 'label_name', 'labels',
+})
+
+
+class TemplateTimeoutError(TemplateError):
+    pass
+
+
+def check_deadline() -> None:
+    if (deadline := deadline_cv.get()) is not None and monotonic() > deadline[0]:
+        raise TemplateTimeoutError(f"rendering took longer than {deadline[1]}s")
+
+
+class DashboardEnvironment(TemplateEnvironment):
+    """
+    Template environment which stops a template running over its time budget,
+    checked on every call, attribute or item access of the (sandboxed) template.
+    """
+
+    def call(__self, __context: Any, __obj: Any, *args: Any, **kwargs: Any) -> Any:
+        check_deadline()
+        return super().call(__context, __obj, *args, **kwargs)
+
+    def getattr(self, obj: Any, attribute: str) -> Any:
+        check_deadline()
+        return super().getattr(obj, attribute)
+
+    def getitem(self, obj: Any, argument: Any) -> Any:
+        check_deadline()
+        return super().getitem(obj, argument)
+
+
+class RenderBudget:
+    """
+    Time budget of a render pass. A walk with a slice returns when the slice is
+    used, so a render on the event loop can let other tasks run in between.
+    """
+
+    def __init__(self, budget: float, slice: float|None = RENDER_SLICE) -> None:
+        self._budget = budget
+        self._deadline = monotonic() + budget if budget > 0 else None
+        self._slice = slice
+        self._until: float|None = None
+
+    def start_slice(self) -> None:
+        self._until = monotonic() + self._slice if self._slice is not None else None
+
+    def expired(self, path: Any) -> bool:
+        """True when the slice is used, raises when the budget of the pass is used."""
+        now = monotonic()
+
+        if self._deadline is not None and now > self._deadline:
+            location = path.location() if hasattr(path, 'location') else path
+            raise HomeAssistantError(f"Rendering took longer than {self._budget}s, stopped at {location}")
+
+        return self._until is not None and now > self._until
+
+
+class TemplateNames(NamedTuple):
+    variables: frozenset[str]
+    filters: frozenset[str]
+    tests: frozenset[str]
+    templates: frozenset[str|None]
+
+
+class TemplateDependencies(NamedTuple):
+    vars: frozenset[str]
+    library: bool
+    volatile: bool
+    registry: bool = False
+    # false when (a macro or template used by) the template could not be analyzed
+    analyzed: bool = True
+
+
+class RenderTopics:
+    """Entities, domains and registries read while rendering templates."""
+
+    __slots__ = ('entities', 'domains', 'all_states', 'registry')
+
+    def __init__(self, registry: bool = False) -> None:
+        self.entities: set[str] = set()
+        self.domains: set[str] = set()
+        self.all_states = False
+        self.registry = registry
+
+    def __bool__(self) -> bool:
+        return self.all_states or self.registry or len(self.entities) > 0 or len(self.domains) > 0
+
+    def update(self, other: 'RenderTopics') -> None:
+        self.entities.update(other.entities)
+        self.domains.update(other.domains)
+        self.all_states |= other.all_states
+        self.registry |= other.registry
+
+    def collect(self, info: RenderInfo) -> None:
+        self.entities.update(info.entities)
+        self.domains.update(info.domains, info.domains_lifecycle)
+        self.all_states |= info.all_states or info.all_states_lifecycle
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            'entities': sorted(self.entities),
+            'domains': sorted(self.domains),
+            'all_states': self.all_states,
+            'registry': self.registry,
+        }
+
+    @staticmethod
+    def from_dict(data: dict[str, Any]) -> 'RenderTopics':
+        topics = RenderTopics(data.get('registry', False))
+        topics.entities.update(data.get('entities', []))
+        topics.domains.update(data.get('domains', []))
+        topics.all_states = data.get('all_states', False)
+
+        return topics
+
+    def matches(self, entity_id: str) -> bool:
+        return self.all_states or entity_id in self.entities or entity_id.split('.', 1)[0] in self.domains
+
+    def intersects(self, changes: 'RenderTopics') -> bool:
+        """Check if any of the changed entities or registries were read."""
+        return (self.registry and changes.registry) or any(self.matches(entity_id) for entity_id in changes.entities)
+
+
+# environments with the filters and tests of a template environment (like slugify
+# or expand), but without globals so these are reported as undeclared names as well
+_analyzers: 'WeakKeyDictionary[TemplateEnvironment, Environment]' = WeakKeyDictionary()
+
+
+def _analyzer(env: TemplateEnvironment) -> Environment:
+    if (analyzer := _analyzers.get(env)) is None:
+        analyzer = Environment()
+        analyzer.globals.clear()
+        analyzer.filters = env.filters
+        analyzer.tests = env.tests
+        _analyzers[env] = analyzer
+
+    return analyzer
+
+
+def find_names(env: TemplateEnvironment, source: str) -> TemplateNames:
+    """Find the names a template reads from its context, filters, tests and referenced templates."""
+    ast = env.parse(source)
+    codegen = TrackingCodeGenerator(_analyzer(env))
+    codegen.visit(ast)
+
+    return TemplateNames(
+        frozenset(codegen.undeclared_identifiers),
+        frozenset(node.name for node in ast.find_all(nodes.Filter)),
+        frozenset(node.name for node in ast.find_all(nodes.Test)),
+        frozenset(find_referenced_templates(ast)),
+    )
+
+
+def compile_expression(env: TemplateEnvironment, source: str) -> TemplateExpression|None:
+    """
+    Compile a template consisting of a single output expression (like
+    "{{ entities }}") to an expression which returns the value itself
+    instead of its string representation.
+    """
+    body = env.parse(source).body
+
+    if len(body) != 1 or not isinstance(body[0], nodes.Output) or len(body[0].nodes) != 1:
+        return None
+
+    if isinstance(expression := body[0].nodes[0], nodes.TemplateData):
+        return None
+
+    # same as Environment.compile_expression, but from the parsed node
+    template = nodes.Template([nodes.Assign(nodes.Name('result', 'store'), expression)], lineno=1)
+    template.set_environment(env)
+
+    return TemplateExpression(compile_template(env, source, template, 'expression'), False)
+
+
+def compile_template(env: TemplateEnvironment, source: str, node: nodes.Template|None = None, kind: str = 'template') -> Template:
+    """
+    Compile the template (or the node parsed from it), the bytecode is taken from
+    (or added to) the bytecode cache of the environment when it has one.
+    """
+    if env.bytecode_cache is None:
+        return env.from_string(node if node is not None else source)
+
+    # keyed by the kind and source, as these templates have no name
+    bucket = env.bytecode_cache.get_bucket(env, kind, source, source)
+
+    if bucket.code is None:
+        bucket.code = env.compile(node if node is not None else source)
+        env.bytecode_cache.set_bucket(bucket)
+
+    return env.template_class.from_code(env, bucket.code, env.make_globals(None))
+
+
+class _Entry:
+    __slots__ = ('env', 'template', 'names', 'expression')
+
+    def __init__(self, env: TemplateEnvironment) -> None:
+        self.env = env
+        self.template: Template|None = None
+        self.names: TemplateNames|None = None
+        # False when the template is not a single expression
+        self.expression: TemplateExpression|bool|None = None
+
+
+class TemplateCache:
+    """LRU cache for compiled templates, keyed by source text and environment."""
+
+    _entries: OrderedDict[tuple[int, str], _Entry]
+
+    def __init__(self, size: int = TEMPLATE_CACHE_SIZE) -> None:
+        self._size = size
+        self._entries = OrderedDict()
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _entry(self, env: TemplateEnvironment, source: str) -> _Entry:
+        # the entry keeps a reference to its environment, so the id can
+        # not be reused by another environment while the entry exists
+        key = (id(env), source)
+
+        # views can be rendered in worker threads
+        with self._lock:
+            if (entry := self._entries.get(key)) is not None:
+                self._entries.move_to_end(key)
+                return entry
+
+            self._entries[key] = entry = _Entry(env)
+
+            if len(self._entries) > self._size:
+                self._entries.popitem(last=False)
+
+            return entry
+
+    def get(self, env: TemplateEnvironment, source: str) -> Template:
+        entry = self._entry(env, source)
+
+        if entry.template is not None:
+            self.hits += 1
+        else:
+            self.misses += 1
+            entry.template = compile_template(env, source)
+
+        return entry.template
+
+    def expression(self, env: TemplateEnvironment, source: str) -> TemplateExpression|None:
+        entry = self._entry(env, source)
+
+        if entry.expression is not None:
+            self.hits += 1
+        else:
+            self.misses += 1
+            entry.expression = compile_expression(env, source) or False
+
+        return entry.expression or None
+
+    def names(self, env: TemplateEnvironment, source: str) -> TemplateNames:
+        entry = self._entry(env, source)
+
+        if entry.names is None:
+            entry.names = find_names(env, source)
+
+        return entry.names
+
+    def invalidate(self, env: TemplateEnvironment) -> None:
+        """Drop all templates compiled by the given environment."""
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == id(env)]:
+                del self._entries[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self) -> dict[str, int]:
+        return {
+            'size': len(self._entries),
+            'max_size': self._size,
+            'hits': self.hits,
+            'misses': self.misses,
+        }
+
+
+TEMPLATE_CACHE: TemplateCache = TemplateCache()
+
+
+class EnvironmentCache:
+    """
+    Template environments (with the compiled macros and templates) shared by the
+    dashboards with the same library, keyed by DashboardConfig.template_key. An
+    environment is dropped (with its compiled templates) when the last dashboard
+    using it releases it.
+    """
+
+    _environments: dict[str, TemplateEnvironment]
+    _users: dict[str, int]
+
+    def __init__(self) -> None:
+        self._environments = {}
+        self._users = {}
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._environments)
+
+    def acquire(self, key: str, factory: Callable[[], TemplateEnvironment]) -> TemplateEnvironment:
+        if key in self._environments:
+            self.hits += 1
+        else:
+            self.misses += 1
+            self._environments[key] = factory()
+            self._users[key] = 0
+
+        self._users[key] += 1
+
+        return self._environments[key]
+
+    def release(self, key: str) -> None:
+        if key not in self._users:
+            return
+
+        self._users[key] -= 1
+
+        if self._users[key] <= 0:
+            TEMPLATE_CACHE.invalidate(self._environments.pop(key))
+            del self._users[key]
+
+    def stats(self) -> dict[str, int]:
+        return {
+            'size': len(self._environments),
+            'users': sum(self._users.values()),
+            'hits': self.hits,
+            'misses': self.misses,
+        }
+
+
+ENVIRONMENTS: EnvironmentCache = EnvironmentCache()
+
+
+class DependencyResolver:
+    """Resolves which dashboard vars a template reads and if it depends on state outside the dashboard config."""
+
+    _library: dict[tuple[str, str], TemplateDependencies]
+
+    def __init__(self, env: TemplateEnvironment, vars: Iterable[str], macros: dict[str, str], templates: dict[str, str]):
+        self._env = env
+        self._vars = frozenset(vars)
+        self._macros = macros
+        self._templates = templates
+        self._library = {}
+
+    def resolve(self, source: str) -> TemplateDependencies:
+        try:
+            names = TEMPLATE_CACHE.names(self._env, source)
+        except TemplateError:
+            # let the renderer report the error, until then it may read anything
+            return TemplateDependencies(self._vars, False, True, True, False)
+
+        return self._resolve(names)
+
+    def _resolve(self, names: TemplateNames) -> TemplateDependencies:
+        vars = set()
+        library = False
+        volatile = not (names.filters <= PURE_FILTERS and names.tests <= PURE_TESTS)
+        registry = not REGISTRY_FUNCTIONS.isdisjoint(names.variables) or not REGISTRY_FUNCTIONS.isdisjoint(names.filters)
+        analyzed = True
+
+        for name in names.variables:
+            if name in self._vars:
+                vars.add(name)
+            elif name in self._macros:
+                library = True
+                dependencies = self._resolve_library('macro', name, self._macros[name])
+                vars.update(dependencies.vars)
+                volatile |= dependencies.volatile
+                registry |= dependencies.registry
+                analyzed &= dependencies.analyzed
+            elif name not in PURE_GLOBALS:
+                volatile = True
+
+        for name in names.templates:
+            library = True
+
+            if name not in self._templates:
+                volatile = True
+                continue
+
+            dependencies = self._resolve_library('template', name, self._templates[name])
+            vars.update(dependencies.vars)
+            volatile |= dependencies.volatile
+            registry |= dependencies.registry
+            analyzed &= dependencies.analyzed
+
+        return TemplateDependencies(frozenset(vars), library, volatile, registry, analyzed)
+
+    def _resolve_library(self, kind: str, name: str, source: str) -> TemplateDependencies:
+        key = (kind, name)
+
+        if key not in self._library:
+            # guard against (mutual) recursion of macros and templates
+            self._library[key] = TemplateDependencies(frozenset(), True, False)
+            self._library[key] = self.resolve(source)
+
+        return self._library[key]
+
+
+class DashboardVars(Mapping[str, Any]):
+    """
+    The vars of a dashboard for one render pass. A var is rendered (with the vars
+    it reads) when it is first read and the value is kept for the rest of the
+    pass, vars which are not read are never rendered. Vars can be read from
+    multiple threads, a var is rendered once while others render concurrently.
+    """
+
+    render: Callable[[str, Any], Any]|None = None
+
+    def __init__(self, sources: dict[str, Any], resolver: DependencyResolver) -> None:
+        self.resolver = resolver
+        self._sources = sources
+        self._values: dict[str, Any] = {}
+        self._locks = {name: Lock() for name in sources}
+        self._contexts: dict[str, frozenset[str]] = {}
+        self._dependencies = {name: self._find(source) for name, source in sources.items()}
+        self._check()
+
+    def __getitem__(self, name: str) -> Any:
+        if name in self._values:
+            return self._values[name]
+
+        source = self._sources[name]
+        reading = reading_cv.get()
+
+        if name in reading:
+            # only possible through a template which could not be analyzed
+            raise HomeAssistantError(f"Circular reference between dashboard vars {' -> '.join([*reading, name])}")
+
+        with self._locks[name]:
+            if name not in self._values:
+                token = reading_cv.set((*reading, name))
+
+                try:
+                    self._values[name] = self.render(name, source) if self.render is not None else source
+                finally:
+                    reading_cv.reset(token)
+
+        return self._values[name]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._sources)
+
+    def __len__(self) -> int:
+        return len(self._sources)
+
+    def context(self, source: str) -> dict[str, Any]:
+        """The vars read by the template (or the macros and templates it uses)."""
+        if (names := self._contexts.get(source)) is None:
+            dependencies = self.resolver.resolve(source)
+
+            if not dependencies.analyzed:
+                return self._context_all(dependencies.vars.difference(reading_cv.get()))
+
+            names = self._contexts[source] = dependencies.vars
+
+        return {name: self[name] for name in names}
+
+    def _context_all(self, names: Iterable[str]) -> dict[str, Any]:
+        """
+        Context of a template which could not be analyzed (and so most likely fails
+        to render), vars which fail to render themselves are left out so the error
+        of the template is reported instead.
+        """
+        context = {}
+
+        for name in names:
+            try:
+                context[name] = self[name]
+            except HomeAssistantError:
+                pass
+
+        return context
+
+    def _find(self, value: Any) -> frozenset[str]:
+        """The vars read by the templates in the (nested) value of a var."""
+        if isinstance(value, str):
+            if not is_template_string(value):
+                return frozenset()
+
+            dependencies = self.resolver.resolve(value)
+
+            # a template which could not be analyzed fails to render, so it is no cycle
+            return dependencies.vars if dependencies.analyzed else frozenset()
+
+        if isinstance(value, dict):
+            value = value.values()
+        elif not isinstance(value, list):
+            return frozenset()
+
+        return frozenset().union(*(self._find(item) for item in value))
+
+    def _check(self) -> None:
+        """Raise for vars which (indirectly) read themselves."""
+        done: set[str] = set()
+
+        def visit(name: str, chain: list[str]) -> None:
+            if name in chain:
+                cycle = chain[chain.index(name):] + [name]
+                raise HomeAssistantError(f"Circular reference between dashboard vars {' -> '.join(cycle)}")
+
+            if name in done:
+                return
+
+            for dependency in sorted(self._dependencies[name]):
+                visit(dependency, [*chain, name])
+
+            done.add(name)
+
+        for name in self._sources:
+            visit(name, [])
+
+
+class RenderMemo:
+    """
+    Results of the templates rendered in one pass, keyed by source. Only for
+    templates which read nothing but vars (which do not change during a pass),
+    macros and pure functions, so not templates reading now, states or random.
+    Results are shared, this is safe as rendering never modifies a value but
+    copies it (see dashboard.Frame).
+    """
+
+    def __init__(self, resolver: DependencyResolver) -> None:
+        self._resolver = resolver
+        self._results: dict[str, Any] = {}
+        self.hits = 0
+
+    def __len__(self) -> int:
+        return len(self._results)
+
+    def get(self, source: str) -> tuple[bool, Any]:
+        if source in self._results:
+            self.hits += 1
+            return True, self._results[source]
+
+        return False, None
+
+    def set(self, source: str, result: Any) -> None:
+        if not self._resolver.resolve(source).volatile:
+            self._results[source] = result
+
+
+class TemplateRenderer:
+    """Renders the template strings of a dashboard with the given vars."""
+
+    def __init__(
+        self,
+        env: TemplateEnvironment,
+        vars: dict[str, Any],
+        native: bool = True,
+        profile: RenderProfile|None = None,
+        memo: RenderMemo|None = None,
+        budget: float|None = None
+    ) -> None:
+        self.env = env
+        self.vars = vars
+        self.native = native
+        self.profile = profile
+        self.memo = memo
+        # seconds a template may take, only enforced by a DashboardEnvironment
+        self.budget = budget or None
+
+    def render(self, source: str, path: Any, topics: RenderTopics|None = None, context: dict[str, Any]|None = None) -> Any:
+        """Render the template, the entities it reads are added to topics when given."""
+        if self.memo is not None:
+            found, result = self.memo.get(source)
+
+            if found:
+                return result
+
+            result = self._render_context(source, path, topics, context)
+            self.memo.set(source, result)
+
+            return result
+
+        return self._render_context(source, path, topics, context)
+
+    def _render_context(self, source: str, path: Any, topics: RenderTopics|None, context: dict[str, Any]|None) -> Any:
+        if context is None:
+            context = self.context(source)
+
+        if self.profile is None:
+            return self._collect(source, path, topics, context)
+
+        token = profile_cv.set(self.profile)
+        start = perf_counter()
+
+        try:
+            result = self._collect(source, path, topics, context)
+        finally:
+            profile_cv.reset(token)
+
+        self.profile.record(path, source, perf_counter() - start, result)
+
+        return result
+
+    def context(self, source: str) -> dict[str, Any]:
+        """The vars to render the template with, dashboard vars are only rendered when the template reads them."""
+        return self.vars.context(source) if isinstance(self.vars, DashboardVars) else self.vars
+
+    def _collect(self, source: str, path: Any, topics: RenderTopics|None, context: dict[str, Any]) -> Any:
+        if topics is None:
+            return self._render(source, path, context)
+
+        info = RenderInfo(None)
+        token = render_info_cv.set(info)
+
+        try:
+            return self._render(source, path, context)
+        finally:
+            render_info_cv.reset(token)
+            topics.collect(info)
+
+    def _render(self, source: str, path: Any, context: dict[str, Any]) -> Any:
+        token = deadline_cv.set((monotonic() + self.budget, self.budget)) if self.budget is not None else None
+
+        try:
+            if self.native and (expression := TEMPLATE_CACHE.expression(self.env, source)) is not None:
+                value = expression(**context)
+
+                try:
+                    return to_native(value)
+                except NotNativeError:
+                    return parse_result(str(value))
+
+            return parse_result(TEMPLATE_CACHE.get(self.env, source).render(**context))
+        except TemplateError as err:
+            location = path.location() if hasattr(path, 'location') else path
+            raise HomeAssistantError(f"Error while parsing template on {location} -> {err.message}")
+        finally:
+            if token is not None:
+                deadline_cv.reset(token)
+
+
+class NotNativeError(Exception):
+    pass
+
+
+def to_native(value: Any) -> Any:
+    """Copy the value rendered by an expression, strings are parsed like a rendered template."""
+    if isinstance(value, str):
+        return parse_result(str(value))
+
+    return _to_native(value)
+
+
+def _to_native(value: Any) -> Any:
+    if value is None or type(value) in (bool, int, float, str):
+        return value
+
+    if isinstance(value, str):
+        # markup and other subclasses
+        return str(value)
+
+    if isinstance(value, (list, tuple)):
+        return [_to_native(item) for item in value]
+
+    if isinstance(value, dict):
+        return {_to_native_key(key): _to_native(item) for key, item in value.items()}
+
+    if isinstance(value, Undefined):
+        return ''
+
+    raise NotNativeError()
+
+
+def _to_native_key(key: Any) -> Any:
+    if key is None or type(key) in (bool, int, float, str):
+        return key
+
+    if isinstance(key, str):
+        return str(key)
+
+    raise NotNativeError()
+
+
+def parse_result(result: str) -> Any:
+    """Parse rendered output as a python literal, other output (like plain text) is returned as is."""
+    try:
+        return literal_eval(result)
+    except (ValueError, SyntaxError, TypeError, MemoryError, RecursionError):
+        return result
+
+
+class ThreadSafeTemplateRenderer(TemplateRenderer):
+    """
+    Renderer for use in a worker thread, templates which read state of Home
+    Assistant (states, device_entities, ...) are rendered on the event loop.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        env: TemplateEnvironment,
+        vars: dict[str, Any],
+        resolver: DependencyResolver,
+        native: bool = True,
+        profile: RenderProfile|None = None,
+        memo: RenderMemo|None = None,
+        budget: float|None = None
+    ) -> None:
+        super().__init__(env, vars, native, profile, memo, budget)
+        self._hass = hass
+        self._resolver = resolver
+
+    def render(self, source: str, path: Any, topics: RenderTopics|None = None, context: dict[str, Any]|None = None) -> Any:
+        if self._resolver.resolve(source).volatile:
+            # the vars are rendered in this thread, so the event loop never waits for a var another thread renders
+            context = self.context(source) if context is None else context
+            return run_callback_threadsafe(self._hass.loop, super().render, source, path, topics, context).result()
+
+        return super().render(source, path, topics, context)
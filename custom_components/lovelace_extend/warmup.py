@@ -0,0 +1,115 @@
+from .const import DATA_WARMUP, DOMAIN, LOGGER
+from collections import deque
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.start import async_at_started
+from time import monotonic
+from typing import TYPE_CHECKING
+import asyncio
+
+if TYPE_CHECKING:
+    from .dashboard import LovelaceWrapper
+
+
+class DashboardWarmup:
+    """
+    Prepares (loads or renders) the managed dashboards in a background task once
+    Home Assistant is started. A dashboard requested by a client before it is
+    prepared is moved to the front of the queue.
+    """
+
+    _queue: deque['LovelaceWrapper']
+    _futures: dict['LovelaceWrapper', asyncio.Future]
+    _task: asyncio.Task|None = None
+    _waiting: bool = False
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        self._hass = hass
+        self._queue = deque()
+        self._futures = {}
+
+    def pending(self, dashboard: 'LovelaceWrapper') -> bool:
+        return dashboard in self._futures
+
+    @callback
+    def async_schedule(self, dashboard: 'LovelaceWrapper') -> None:
+        if dashboard in self._futures:
+            return
+
+        self._futures[dashboard] = self._hass.loop.create_future()
+        self._queue.append(dashboard)
+
+        if not self._waiting:
+            self._waiting = True
+            async_at_started(self._hass, self._async_started)
+
+    async def async_wait(self, dashboard: 'LovelaceWrapper') -> None:
+        """Move the dashboard to the front of the queue and wait till it is prepared."""
+        if (future := self._futures.get(dashboard)) is None:
+            return
+
+        if dashboard in self._queue:
+            self._queue.remove(dashboard)
+            self._queue.appendleft(dashboard)
+            # a client is waiting, so do not wait for Home Assistant to be started
+            self._async_run()
+
+        await asyncio.shield(future)
+
+    @callback
+    def async_remove(self, dashboard: 'LovelaceWrapper') -> None:
+        if dashboard in self._queue:
+            self._queue.remove(dashboard)
+            self._resolve(dashboard)
+
+    @callback
+    def async_cancel(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+        self._queue.clear()
+
+        for dashboard in list(self._futures):
+            self._resolve(dashboard)
+
+    @callback
+    def _async_started(self, hass: HomeAssistant) -> None:
+        self._waiting = False
+        self._async_run()
+
+    @callback
+    def _async_run(self) -> None:
+        if len(self._queue) > 0 and (self._task is None or self._task.done()):
+            self._task = self._hass.async_create_background_task(self._async_prepare(), f"{DOMAIN} dashboard warm-up")
+
+    async def _async_prepare(self) -> None:
+        while len(self._queue) > 0:
+            dashboard = self._queue.popleft()
+            start = monotonic()
+
+            try:
+                await dashboard.async_warmup()
+            except asyncio.CancelledError:
+                # the load is cancelled when the dashboard is unwrapped, only stop when the warm-up itself is cancelled
+                if (task := asyncio.current_task()) is not None and task.cancelling() > 0:
+                    raise
+
+                LOGGER.debug("preparing dashboard \"%s\" was cancelled", dashboard.url_path)
+            except Exception as err:  # noqa: BLE001
+                # a client waiting for the dashboard will load (and get the error) itself
+                LOGGER.error("failed to prepare dashboard \"%s\": %s", dashboard.url_path, err)
+            else:
+                LOGGER.debug("prepared dashboard \"%s\" in %.3fs", dashboard.url_path, monotonic() - start)
+            finally:
+                self._resolve(dashboard)
+
+    def _resolve(self, dashboard: 'LovelaceWrapper') -> None:
+        if (future := self._futures.pop(dashboard, None)) is not None and not future.done():
+            future.set_result(None)
+
+
+def get_warmup(hass: HomeAssistant) -> DashboardWarmup:
+    if DATA_WARMUP not in hass.data:
+        hass.data[DATA_WARMUP] = DashboardWarmup(hass)
+
+    return hass.data[DATA_WARMUP]